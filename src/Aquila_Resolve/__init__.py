@@ -6,5 +6,17 @@ Grapheme to Phoneme Resolver
 """
 __version__ = "0.1.4"
 
-from .g2p import G2p
-from .data.remote import download
+__all__ = ["G2p", "download"]
+
+
+def __getattr__(name):
+    # Lazy imports, so that importing the package does not load torch or nltk
+    if name == "G2p":
+        from .g2p import G2p
+
+        return G2p
+    if name == "download":
+        from .data.remote import download
+
+        return download
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,141 @@
+# Token budget of inference batches, and its tuning for the current machine
+from __future__ import annotations
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import warnings
+from typing import TYPE_CHECKING, Iterable
+
+from .data import get_cache_dir
+
+if TYPE_CHECKING:
+    from .infer import Infer
+
+# Padded tokens of a batch (input length times decoding steps), when no budget is tuned.
+# About 32 words of common length.
+DEFAULT_TOKEN_BUDGET = 8192
+# Candidate budgets of the tuning benchmark
+TUNE_BUDGETS = (1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+re_variant = re.compile(r"\(\d+\)$")
+
+
+def num_threads(backend: str) -> int:
+    """Number of threads an inference backend computes with"""
+    if backend == "torch":
+        # Deferred import, only loaded with the model
+        import torch
+
+        return torch.get_num_threads()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def config_path() -> str:
+    """Path of the batching config file written by tune_token_budget, in the user cache directory"""
+    return str(get_cache_dir().joinpath("batching.json"))
+
+
+def _config_key(backend: str, threads: int) -> str:
+    return f"{backend}:{threads}"
+
+
+def _read_config(path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_token_budget(backend: str, threads: int, path=None) -> int:
+    """
+    Gets the tuned token budget of a backend and thread count.
+
+    :param backend: Inference backend, 'torch' or 'numpy'
+    :param threads: Number of threads of the backend
+    :param path: Path of the batching config file, defaults to config_path()
+    :return: Tuned token budget, or DEFAULT_TOKEN_BUDGET if not tuned
+    """
+    config = _read_config(config_path() if path is None else path)
+    return config.get(_config_key(backend, threads), DEFAULT_TOKEN_BUDGET)
+
+
+def _sample_words(count: int) -> list[str]:
+    """Evenly spaced sample of dictionary words, with their natural length distribution"""
+    from .static_dict import get_cmudict
+
+    words = sorted({re_variant.sub("", w) for w in get_cmudict() if w.isalpha()})
+    return words[:: max(1, len(words) // count)][:count]
+
+
+def tune_token_budget(
+    infer: Infer,
+    budgets: Iterable[int] = TUNE_BUDGETS,
+    words: list[str] | None = None,
+    path=None,
+) -> dict[int, float]:
+    """
+    Benchmarks inference throughput for candidate token budgets, and records the fastest
+    in the batching config file for the backend and thread count of the Infer instance.
+    The Infer instance is set to use the fastest budget, even if the file can not be written.
+
+    :param infer: Infer instance to benchmark
+    :param budgets: Candidate token budgets
+    :param words: Words to predict in each run, defaults to a sample of 1000 dictionary words
+    :param path: Path of the batching config file, defaults to config_path(), which Infer reads
+    :return: Words per second of each budget
+    """
+    if words is None:
+        words = _sample_words(1000)
+    path = config_path() if path is None else str(path)
+    infer.load()
+    infer._predict(words[:32])  # Warmup
+    rates = {}
+    for budget in budgets:
+        infer.token_budget = budget
+        start = time.perf_counter()
+        infer._predict(words)  # Bypasses the persistent prediction cache
+        rates[budget] = len(words) / (time.perf_counter() - start)
+    best = max(rates, key=rates.get)
+    infer.token_budget = best
+
+    config = _read_config(path)
+    config[_config_key(infer.backend, num_threads(infer.backend))] = best
+    # Written to a temporary file then renamed, so readers never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        warnings.warn(f"Could not write the batching config, budget not saved: {e}")
+    return rates
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point of the tuning benchmark"""
+    from .infer import BACKENDS, Infer
+
+    parser = argparse.ArgumentParser(
+        prog="aquila-resolve-tune",
+        description="Finds the fastest inference batch token budget for this machine",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--words", type=int, default=1000, help="words per run")
+    args = parser.parse_args(argv)
+    infer = Infer(backend=args.backend, lazy=True)
+    rates = tune_token_budget(infer, words=_sample_words(args.words))
+    for budget, rate in rates.items():
+        print(f"{budget:>6}: {rate:.0f} words/s", file=sys.stderr)
+    threads = num_threads(args.backend)
+    print(f"{args.backend} with {threads} threads: {infer.token_budget}")
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
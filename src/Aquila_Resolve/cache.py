@@ -0,0 +1,286 @@
+# Persistent caches for model predictions
+from __future__ import annotations
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+from .data.remote import get_checksum
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    checksum TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    word TEXT NOT NULL,
+    phonemes TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (checksum, lang, word)
+);
+CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used);
+CREATE TABLE IF NOT EXISTS model (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    checksum TEXT NOT NULL
+);
+"""
+
+# Max number of variables in a single sqlite query
+_MAX_VARS = 500
+
+
+class PredictionCache:
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        model_path: str | os.PathLike,
+        max_size: int = 100000,
+        variant: str | None = None,
+        touch_age: float = 3600.0,
+        stale_age: float = 30 * 86400.0,
+    ):
+        """
+        Creates a persistent, sqlite backed cache of model predictions.
+
+        Predictions are keyed by (model checksum, lang, word), so processes using different
+        models or precisions can share a cache file. The cache can be shared by multiple processes.
+
+        Eviction is approximately least recently used. Reads only mark entries as used when
+        their last use is older than touch_age, so most reads do not write to the database.
+
+        :param path: Path to the sqlite database file, created if it does not exist
+        :param model_path: Path to the model checkpoint the predictions are made with
+        :param max_size: Max number of entries, least recently used entries are evicted beyond this
+        :param variant: Variant of the model, such as a quantized precision, which is part of the checksum
+        :param touch_age: Seconds after which a read marks an entry as recently used again
+        :param stale_age: Seconds after which unused entries of other model checksums are removed
+            when the cache is opened
+        """
+        self.path = str(path)
+        self.max_size = max_size
+        self.touch_age = touch_age
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        # Write-ahead log allows readers to run concurrently with a writer
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self.checksum = self._model_checksum(str(model_path))
+        if variant is not None:
+            self.checksum = f"{self.checksum}:{variant}"
+        # Remove predictions of other model checkpoints that are no longer used
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM predictions WHERE checksum != ? AND used < ?",
+                (self.checksum, time.time() - stale_age),
+            )
+        # Upper bound of the number of entries, counted again when it passes max_size
+        self._count = len(self)
+
+    def _model_checksum(self, model_path: str) -> str:
+        """Gets the checksum of the model, only hashing the file again if it was modified"""
+        stat = os.stat(model_path)
+        row = self._conn.execute(
+            "SELECT checksum FROM model WHERE path = ? AND size = ? AND mtime = ?",
+            (model_path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        checksum = get_checksum(model_path)
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO model VALUES (?, ?, ?, ?)",
+                (model_path, stat.st_size, stat.st_mtime_ns, checksum),
+            )
+        return checksum
+
+    def get_many(self, lang: str, words: Iterable[str]) -> dict[str, str]:
+        """
+        Gets cached predictions of words.
+
+        :param lang: Language of the words
+        :param words: Words to look up
+        :return: Dict of {word: phonemes} for the words found in the cache
+        """
+        words = list(dict.fromkeys(words))
+        result = {}
+        touch = []
+        touch_before = time.time() - self.touch_age
+        for i in range(0, len(words), _MAX_VARS):
+            chunk = words[i : i + _MAX_VARS]
+            rows = self._conn.execute(
+                "SELECT word, phonemes, used FROM predictions WHERE checksum = ? AND lang = ? "
+                f"AND word IN ({', '.join('?' * len(chunk))})",
+                (self.checksum, lang, *chunk),
+            )
+            for word, phonemes, used in rows:
+                result[word] = phonemes
+                if used < touch_before:
+                    touch.append(word)
+        if touch:
+            # Mark the entries as recently used
+            now = time.time()
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE predictions SET used = ? WHERE checksum = ? AND lang = ? AND word = ?",
+                    ((now, self.checksum, lang, word) for word in touch),
+                )
+        return result
+
+    def set_many(self, lang: str, predictions: dict[str, str]) -> None:
+        """
+        Adds predictions to the cache, evicting least recently used entries beyond max_size.
+        Entries are evicted down to nine tenths of max_size, so the cache is only counted
+        once every max_size / 10 additions.
+
+        :param lang: Language of the words
+        :param predictions: Dict of {word: phonemes}
+        """
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                ((self.checksum, lang, w, ph, now) for w, ph in predictions.items()),
+            )
+            self._count += len(predictions)
+            if self._count <= self.max_size:
+                return
+            # Other processes may have added or evicted entries
+            self._count = len(self)
+            excess = self._count - (self.max_size - self.max_size // 10)
+            if self._count > self.max_size and excess > 0:
+                self._conn.execute(
+                    "DELETE FROM predictions WHERE rowid IN "
+                    "(SELECT rowid FROM predictions ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+
+    def clear(self) -> None:
+        """Removes all entries"""
+        with self._conn:
+            self._conn.execute("DELETE FROM predictions")
+        self._count = 0
+
+    def close(self) -> None:
+        """Closes the database connection"""
+        self._conn.close()
+
+    def reopen(self) -> None:
+        """
+        Opens a new database connection, for use in a forked child process.
+        The connection inherited from the parent is kept open and never used,
+        as closing it in the child is not safe.
+        """
+        self._inherited = self._conn
+        self._conn = sqlite3.connect(self.path, timeout=30)
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+
+class LRUCache:
+    def __init__(self, max_size: int | None = 100000, max_bytes: int | None = None):
+        """
+        Creates an in-memory cache with least recently used eviction.
+
+        :param max_size: Max number of entries, None for no limit
+        :param max_bytes: Max approximate size of keys and values in bytes, None for no limit
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets the value of a key, marking it as recently used.
+
+        :param key: Key to look up
+        :param default: Value returned if the key is not cached
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Gets the value of a key, without marking it as recently used or counting statistics.
+
+        :param key: Key to look up
+        :param default: Value returned if the key is not cached
+        """
+        entry = self._data.get(key)
+        return default if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Caches the value of a key, evicting least recently used entries if needed.
+
+        :param key: Key to cache
+        :param value: Value of the key
+        """
+        size = _sizeof(key) + sys.getsizeof(value)
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._data[key] = (value, size)
+        self.bytes += size
+        self._evict()
+
+    def resize(self, max_size: int | None = None, max_bytes: int | None = None) -> None:
+        """
+        Sets new bounds for the cache, evicting entries if needed.
+
+        :param max_size: Max number of entries, None for no limit
+        :param max_bytes: Max approximate size of keys and values in bytes, None for no limit
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self) -> None:
+        """Removes all entries and resets the statistics"""
+        self._data.clear()
+        self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> dict[str, int | None]:
+        """Returns the statistics and bounds of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+            "bytes": self.bytes,
+            "max_size": self.max_size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_size is not None and len(self._data) > self.max_size)
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _sizeof(key: Hashable) -> int:
+    """Approximate size of a key in bytes, including the items of tuples"""
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+    return sys.getsizeof(key)
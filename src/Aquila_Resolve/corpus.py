@@ -0,0 +1,163 @@
+# Parallel conversion of large text corpora
+from __future__ import annotations
+import gc
+import itertools
+import multiprocessing
+import os
+import sys
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, Iterator, TextIO
+
+if TYPE_CHECKING:
+    from .g2p import G2p
+
+# G2p instance of a worker process, inherited from the parent on fork
+_worker_g2p: G2p | None = None
+
+
+def read_lines(source) -> Iterator[str]:
+    """
+    Yields the text lines of a corpus, without line endings.
+
+    :param source: Path of a text file, a list or tuple of paths, or an iterable of text lines
+    """
+    if isinstance(source, (str, os.PathLike)):
+        source = [source]
+    if isinstance(source, (list, tuple)):
+        for path in source:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    yield line.rstrip("\r\n")
+    else:
+        for line in source:
+            yield line.rstrip("\r\n")
+
+
+def _chunks(lines: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    it = iter(lines)
+    chunk = list(itertools.islice(it, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(it, chunk_size))
+
+
+def _cpu_count() -> int:
+    """Number of CPUs this process can run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _warm_up(g2p: G2p) -> None:
+    """Loads the lazily loaded resources, so forked workers share them"""
+    g2p.infer.load()
+    g2p.convert("The 2 cats' books were read.")
+
+
+def _init_worker() -> None:
+    # Parallelism comes from the processes, each model runs on a single thread
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+    # The sqlite connection of the parent can not be used after a fork
+    if _worker_g2p.infer.cache is not None:
+        _worker_g2p.infer.cache.reopen()
+
+
+def _convert_chunk(lines: list[str], convert_num: bool) -> list[str]:
+    return _worker_g2p.convert_batch(lines, convert_num=convert_num)
+
+
+def iter_corpus(
+    g2p: G2p,
+    source,
+    workers: int | None = None,
+    chunk_size: int = 500,
+    max_pending: int | None = None,
+    convert_num: bool = True,
+) -> Iterator[str]:
+    """
+    Converts the lines of a corpus, yielding results in input order.
+
+    Workers are forked from the current process after the resources of the G2p instance
+    are loaded, so the dictionaries and model weights are shared copy-on-write.
+    Objects are moved out of garbage collection with gc.freeze() before forking,
+    so collections in the workers do not write to (and copy) the shared pages.
+
+    :param g2p: G2p instance used by all workers
+    :param source: Path of a text file, a list or tuple of paths, or an iterable of text lines
+    :param workers: Number of worker processes, defaults to the number of CPUs.
+        Lines are converted in this process if 1, or if fork is not supported.
+    :param chunk_size: Number of lines sent to a worker at a time
+    :param max_pending: Max number of chunks being converted or waiting to be yielded,
+        defaults to twice the number of workers
+    :param convert_num: True to convert numbers to words
+    """
+    global _worker_g2p
+    if workers is None:
+        workers = _cpu_count()
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from g2p.convert_iter(read_lines(source), chunk_size, convert_num)
+        return
+    if g2p.infer.device != "cpu":
+        raise ValueError(
+            f"Worker processes require a cpu device, not {g2p.infer.device}"
+        )
+    if max_pending is None:
+        max_pending = 2 * workers
+
+    _warm_up(g2p)
+    _worker_g2p = g2p
+    gc.collect()
+    gc.freeze()
+    try:
+        pool = multiprocessing.get_context("fork").Pool(workers, _init_worker)
+    finally:
+        # Workers keep the frozen objects, the parent collects them again
+        gc.unfreeze()
+        _worker_g2p = None
+    chunks = _chunks(read_lines(source), chunk_size)
+    with pool:
+        # Bounded window of chunks in flight, yielded in submission order
+        pending = deque()
+        for chunk in chunks:
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+            pending.append(pool.apply_async(_convert_chunk, (chunk, convert_num)))
+        while pending:
+            yield from pending.popleft().get()
+
+
+def convert_corpus(
+    g2p: G2p,
+    source,
+    output: str | os.PathLike | TextIO,
+    workers: int | None = None,
+    chunk_size: int = 500,
+    max_pending: int | None = None,
+    convert_num: bool = True,
+) -> int:
+    """
+    Converts the lines of a corpus with worker processes, writing results in input order.
+
+    :param g2p: G2p instance used by all workers
+    :param source: Path of a text file, a list or tuple of paths, or an iterable of text lines
+    :param output: Path of the output text file, or a writable text stream
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :param chunk_size: Number of lines sent to a worker at a time
+    :param max_pending: Max number of chunks being converted or waiting to be written,
+        defaults to twice the number of workers
+    :param convert_num: True to convert numbers to words
+    :return: Number of lines converted
+    """
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, "w", encoding="utf-8") as f:
+            return convert_corpus(
+                g2p, source, f, workers, chunk_size, max_pending, convert_num
+            )
+    count = 0
+    results = iter_corpus(g2p, source, workers, chunk_size, max_pending, convert_num)
+    for line in results:
+        output.write(line)
+        output.write("\n")
+        count += 1
+    return count
@@ -1,4 +1,7 @@
+import os
 import sys
+import zlib
+from pathlib import Path
 
 if sys.version_info < (3, 9):
     # In Python versions below 3.9, this is needed
@@ -12,3 +15,34 @@ DATA_PATH = files(__name__)
 CMU_FILE = DATA_PATH.joinpath("cmudict.json.gz")
 HET_FILE = DATA_PATH.joinpath("heteronyms.json")
 PT_FILE = DATA_PATH.joinpath("model.pt")
+
+
+def get_cache_dir() -> Path:
+    """
+    User directory for files compiled or tuned at runtime, which may not be writable
+    in the installed package. Set AQUILA_RESOLVE_CACHE to use another directory.
+    """
+    path = os.environ.get("AQUILA_RESOLVE_CACHE")
+    if path:
+        return Path(path)
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "Aquila-Resolve"
+
+
+def get_cache_file(source, suffix: str) -> str:
+    """
+    Path of a file generated from a source file, in the user cache directory.
+    Named by the source file and a hash of its absolute path, so each source has its own file.
+
+    :param source: Path of the source file
+    :param suffix: Suffix of the generated file, with its extension (e.g. '.bin')
+    """
+    source = os.path.abspath(str(source))
+    stem = os.path.basename(source).split(".")[0]
+    path_hash = zlib.crc32(source.encode("utf-8"))
+    return str(get_cache_dir().joinpath(f"{stem}-{path_hash:08x}{suffix}"))
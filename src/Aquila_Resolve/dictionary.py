@@ -3,18 +3,56 @@
 from __future__ import annotations
 from os.path import exists
 import json
-from .symbols import get_parent_pos
+from .symbols import get_parent_pos, pos_tags, pos_tags_set
 from .data import DATA_PATH
 
 
+# Resolves the phoneme of a dictionary entry using Part of Speech tag
+def _resolve(sub_dict: dict, pos: str) -> str | None:
+    # First, check if the exact pos is a key
+    if pos in sub_dict:
+        return sub_dict[pos]
+
+    # If not, use the parent pos of the pos tag
+    parent_pos = get_parent_pos(pos) if pos else None
+
+    if parent_pos is not None:
+        # Check if the sub_dict contains the parent pos
+        if parent_pos in sub_dict:
+            return sub_dict[parent_pos]
+
+    # If not, check if the sub_dict contains a DEFAULT key
+    if "DEFAULT" in sub_dict:
+        return sub_dict["DEFAULT"]
+
+    # If no matches, return None
+    return None
+
+
+# Compiles a flat (word, pos) -> phoneme table, for every Penn Treebank pos tag
+def compile_table(dictionary: dict) -> dict[tuple[str, str], str | None]:
+    return {
+        (word, pos): _resolve(sub_dict, pos)
+        for word, sub_dict in dictionary.items()
+        for pos in pos_tags
+    }
+
+
 # Dictionary class
 class Dictionary:
     def __init__(self, file_name=None):
+        """
+        Heteronym dictionary
+
+        :param file_name: Path to a heteronym dictionary json file. Built-in dictionary will be used if None
+        """
         # If a file name is not provided, use the default file name
         self.file_name = file_name
         if self.file_name is None:
             self.file_name = "heteronyms.json"
         self.dictionary = {}
+        # Compiled (word, pos) -> phoneme table, filled a word at a time on first lookup
+        self.table = {}
         self.dictionary = self.load_dictionary(file_name)
 
     # Loads the dictionary from the json file
@@ -38,26 +76,22 @@ class Dictionary:
         word = word.lower()
         return word in self.dictionary
 
+    # Check if any of a list of words is in the dictionary
+    def contains_any(self, words) -> bool:
+        return not self.dictionary.keys().isdisjoint(word.lower() for word in words)
+
     # Get the phonetic pronunciation of a word using Part of Speech tag
     def get_phoneme(self, word, pos) -> str | None:
-        # Get the sub-dictionary at dictionary[word]
-        sub_dict = self.dictionary[word.lower()]
-
-        # First, check if the exact pos is a key
-        if pos in sub_dict:
-            return sub_dict[pos]
-
-        # If not, use the parent pos of the pos tag
-        parent_pos = get_parent_pos(pos)
-
-        if parent_pos is not None:
-            # Check if the sub_dict contains the parent pos
-            if parent_pos in sub_dict:
-                return sub_dict[parent_pos]
-
-        # If not, check if the sub_dict contains a DEFAULT key
-        if "DEFAULT" in sub_dict:
-            return sub_dict["DEFAULT"]
-
-        # If no matches, return None
-        return None
+        word = word.lower()
+        # Single probe of the compiled table
+        try:
+            return self.table[(word, pos)]
+        except KeyError:
+            pass
+        # Word not in the dictionary (raises KeyError), or not compiled yet
+        sub_dict = self.dictionary[word]
+        if pos not in pos_tags_set:
+            # Pos tags outside the table, resolved each time
+            return _resolve(sub_dict, pos)
+        self.table.update(compile_table({word: sub_dict}))
+        return self.table[(word, pos)]
@@ -0,0 +1,61 @@
+# Export of the model checkpoint to TorchScript
+from __future__ import annotations
+import argparse
+import os
+from .data import PT_FILE, get_cache_file
+from .data.remote import ensure_download, get_checksum
+
+
+def scripted_path(checkpoint_path: str | os.PathLike | None = None) -> str:
+    """
+    Path of the scripted model exported from a checkpoint, in the user cache directory.
+
+    :param checkpoint_path: Path of the model checkpoint (.pt), defaults to the bundled model
+    """
+    return get_cache_file(checkpoint_path or PT_FILE, ".ts")
+
+
+def export_scripted(
+    checkpoint_path: str | os.PathLike | None = None,
+    output_path: str | os.PathLike | None = None,
+) -> str:
+    """
+    Compiles the model checkpoint with TorchScript, for faster inference.
+
+    The frozen module runs the whole decoding loop without Python overhead. It is stamped
+    with the checksum of the checkpoint and the version of the decoding code, and Infer
+    loads it in place of the checkpoint while both match.
+
+    :param checkpoint_path: Path of the model checkpoint (.pt), defaults to the bundled model
+    :param output_path: Path of the scripted model (.ts), defaults to the location read by Infer,
+        scripted_path of the checkpoint
+    :return: Path of the scripted model
+    """
+    if checkpoint_path is None:
+        ensure_download()
+        checkpoint_path = PT_FILE
+    if output_path is None:
+        output_path = scripted_path(checkpoint_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    # Deferred import, torch is only loaded with the model
+    from .models.dp.model.model import save_scripted
+
+    checksum = get_checksum(str(checkpoint_path))
+    save_scripted(str(checkpoint_path), str(output_path), checksum=checksum)
+    return str(output_path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point of the export"""
+    parser = argparse.ArgumentParser(
+        prog="aquila-resolve-export",
+        description="Exports the model checkpoint to a TorchScript module",
+    )
+    parser.add_argument("--checkpoint", help="model checkpoint (.pt)")
+    parser.add_argument("--output", help="scripted model file (.ts)")
+    args = parser.parse_args(argv)
+    print(export_scripted(args.checkpoint, args.output))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -1,3 +1,4 @@
+from __future__ import annotations
 from unicodedata import normalize
 import re
 
@@ -7,6 +8,70 @@ re_filter_with_num = re.compile(r"[^ A-Za-z\d'.,?!(){}\-]")
 re_multi_space = re.compile(r"\s\s+")
 
 
+class _FilterTable(dict):
+    def __init__(self, pattern: re.Pattern, keep: str = ""):
+        """
+        Translation table for str.translate, deleting the characters matched by a pattern.
+        Entries are filled on first lookup of each code point, so after normalization
+        combining marks and other invalid characters are removed in a single pass.
+
+        :param pattern: Pattern matching a single invalid character
+        :param keep: Invalid characters to keep, such as separators of joined texts
+        """
+        super().__init__()
+        self._invalid = pattern
+        self._keep = keep
+
+    def __missing__(self, key: int) -> int | None:
+        char = chr(key)
+        value = None if char not in self._keep and self._invalid.match(char) else key
+        self[key] = value
+        return value
+
+
+_patterns = {False: re_filter, True: re_filter_with_num}
+# Translation tables, keyed by (allow_num, separator)
+_tables = {
+    (allow_num, sep): _FilterTable(pattern, sep)
+    for allow_num, pattern in _patterns.items()
+    for sep in ("", "\n")
+}
+# Invalid ASCII characters, deleted with bytes.translate for ASCII-only text
+_ascii_delete = {
+    (allow_num, sep): bytes(
+        c for c in range(128) if chr(c) != sep and pattern.match(chr(c))
+    )
+    for allow_num, pattern in _patterns.items()
+    for sep in ("", "\n")
+}
+# After filtering, spaces are the only whitespace left
+_re_spaces = re.compile("  +")
+
+
+def _filter(text: str, allow_num: bool, sep: str = "") -> str:
+    """Removes accents and invalid characters, without changing case or spacing"""
+    if not text.isascii():
+        # Strip accents
+        text = normalize("NFD", text)
+        if allow_num:
+            # Non-ASCII digits are valid, decomposed combining marks are deleted
+            return text.translate(_tables[allow_num, sep])
+    # Valid characters are all ASCII, so everything else can be dropped on encoding
+    data = text.encode("ascii", "ignore")
+    return data.translate(None, _ascii_delete[allow_num, sep]).decode("ascii")
+
+
+def _finish(text: str, preserve_case: bool) -> str:
+    """Collapses spaces and lower-cases filtered text"""
+    # Remove all spaces more than 1
+    if "  " in text:
+        text = _re_spaces.sub(" ", text)
+    # To lowercase
+    if not preserve_case:
+        text = text.lower()
+    return text
+
+
 # Filters text before parsing
 # @param text: text to be filtered
 # @return: filtered text
@@ -18,17 +83,25 @@ def filter_text(text: str, allow_num: bool = False, preserve_case: bool = False)
     :param text: Input raw text
     :return: Text after stripped accents, lower-cased, and invalid punctuation removed
     """
-    # Strip accents
-    text = normalize("NFD", text)
-    # To lowercase
-    if not preserve_case:
-        text = text.lower()
-    # Remove all invalid punctuation
-    if allow_num:
-        text = re.sub(re_filter_with_num, "", text)
-    else:
-        text = re.sub(re_filter, "", text)
-    # Remove all spaces more than 1
-    text = re.sub(re_multi_space, " ", text)
-    # Return
-    return text
+    return _finish(_filter(text, allow_num), preserve_case)
+
+
+def filter_many(
+    texts: list[str], allow_num: bool = False, preserve_case: bool = False
+) -> list[str]:
+    """
+    Filters a list of texts, same as calling filter_text on each.
+    Texts are filtered together in one pass where possible.
+
+    :param texts: Input raw texts
+    :param allow_num: True if numbers are allowed
+    :param preserve_case: True to keep the case of the texts
+    :return: List of filtered texts
+    """
+    if len(texts) < 2:
+        return [filter_text(text, allow_num, preserve_case) for text in texts]
+    # Newlines are invalid characters, so they can only separate texts that contain none
+    joined = "\n".join(texts)
+    if joined.count("\n") != len(texts) - 1:
+        return [filter_text(text, allow_num, preserve_case) for text in texts]
+    return _finish(_filter(joined, allow_num, "\n"), preserve_case).split("\n")
@@ -1,20 +1,24 @@
 # Extended Grapheme to Phoneme conversion using CMU Dictionary and Heteronym parsing.
 from __future__ import annotations
 import re
-from functools import lru_cache
+import threading
+from itertools import islice
+from typing import Iterable, Iterator
 
 import pywordsegment
 from nltk.stem import WordNetLemmatizer
 from nltk.stem.snowball import SnowballStemmer
 
 from .h2p import H2p
-from .text.replace import replace_first
+from .text.replace import replace_words
 from .format_ph import with_cb
 from .static_dict import get_cmudict
 from .text.numbers import normalize_numbers
-from .filter import filter_text
+from .filter import filter_many
 from .processors import Processor
 from .infer import Infer
+from .cache import LRUCache
+from .corpus import convert_corpus
 from .symbols import contains_alpha, valid_braces
 from .data.remote import ensure_nltk
 
@@ -22,16 +26,45 @@ re_digit = re.compile(r"\((\d+)\)")
 re_bracket_with_digit = re.compile(r"\(.*\)")
 re_phonemes = re.compile(r"\{.*?}")
 
+# Sentinel for uncached lookups
+_missing = object()
+# Stand-in phonemes of words queued for batch inference during a lookup dry-run
+_QUEUED = "AH0"
+
 
 class G2p:
-    def __init__(self, device: str = "cpu"):
+    def __init__(
+        self,
+        device: str = "cpu",
+        infer_cache: str = None,
+        lookup_cache_size: int = 100000,
+        lookup_cache_bytes: int = None,
+        lazy_infer: bool = False,
+        warm_infer: bool = False,
+        mmap_dict: bool = False,
+        compact_dict: bool = False,
+        precision: str = "fp32",
+        infer_backend: str = "torch",
+    ):
         """
         Initialize the G2p converter.
 
         :param device: Pytorch device.
+        :param infer_cache: Path of a persistent prediction cache file, shared across processes (Optional)
+        :param lookup_cache_size: Max number of cached lookup results, None for no limit
+        :param lookup_cache_bytes: Max approximate size of cached lookup results in bytes (Optional)
+        :param lazy_infer: Defers loading the inference model until a word needs inference
+        :param warm_infer: With lazy_infer, loads the inference model in a background thread
+        :param mmap_dict: Serves the CMU Dictionary from a memory-mapped binary file, shared between processes.
+            Starts faster and uses less memory, but each lookup costs about ten times a dict lookup.
+            The file is compiled in the user cache directory, falling back to the json dictionary.
+        :param compact_dict: Keeps the CMU Dictionary in memory as compact phoneme indices, ignored with mmap_dict.
+            Lookups cost the same as with mmap_dict
+        :param precision: Inference model precision, 'fp32' or 'int8' for dynamic quantization on cpu
+        :param infer_backend: Inference backend, 'torch' or 'numpy' to run the model without torch (fp32 on cpu)
         """
         ensure_nltk()  # Ensure nltk data is downloaded
-        self.dict = get_cmudict()  # CMU Dictionary
+        self.dict = get_cmudict(mmap=mmap_dict, compact=compact_dict)  # CMU Dictionary
         self.h2p = H2p(preload=True)  # H2p parser
         # WordNet Lemmatizer - used to find singular form
         self.lemmatize = WordNetLemmatizer().lemmatize
@@ -39,7 +72,17 @@ class G2p:
         self.stem = SnowballStemmer("english").stem
         self.segment = pywordsegment.WordSegmenter().segment  # Word Segmenter
         self.p = Processor(self)  # Processor for processing text
-        self.infer = Infer(device=device)
+        self.infer = Infer(
+            device=device,
+            cache_path=infer_cache,
+            lazy=lazy_infer,
+            precision=precision,
+            backend=infer_backend,
+        )
+        if lazy_infer and warm_infer:
+            threading.Thread(target=self.infer.load, daemon=True).start()
+        # Cache of lookup results
+        self.lookup_cache = LRUCache(lookup_cache_size, lookup_cache_bytes)
 
         # Morphic Resolution Features
         # Searches for depluralized form of words
@@ -58,10 +101,15 @@ class G2p:
         # Infer
         self.ft_infer = True
 
-    @lru_cache(maxsize=None)
+        # Words queued for batch inference during a lookup dry-run
+        self._infer_queue: set[str] | None = None
+        # Batch inferred phonemes, consumed by lookup
+        self._predictions: dict[str, str] = {}
+
     def lookup(self, text: str, pos: str = None) -> str | None:
         """
         Gets the CMU Dictionary entry for a word.
+        Results are cached in lookup_cache.
 
         Options for ph_format:
 
@@ -74,9 +122,31 @@ class G2p:
         :param pos: Part of speech tag (Optional)
         :type: str
         """
+        word = text.lower()
+        # The pos tag is only used to check for plurals
+        key = (word, None if pos is None else pos in {"NNS", "NNPS"})
+        if self._infer_queue is None:
+            res = self.lookup_cache.get(key, _missing)
+        else:
+            # Dry-run lookups for batch inference do not count in the cache statistics
+            res = self.lookup_cache.peek(key, _missing)
+        if res is not _missing:
+            return res
+        res = self._lookup(word, pos)
+        # Results of a dry-run for batch inference are incomplete, and not cached
+        if self._infer_queue is None:
+            self.lookup_cache.put(key, res)
+        return res
+
+    def _lookup(self, word: str, pos: str = None) -> str | None:
+        """
+        Resolves the phonemes of a lowercase word, without caching.
+
+        :param word: Word to lookup
+        :param pos: Part of speech tag (Optional)
+        """
 
         # Get the CMU Dictionary entry for the word
-        word = text.lower()
         record = self.dict.get(word)
 
         # Has entry, return it directly
@@ -121,32 +191,111 @@ class G2p:
 
         # Inference with model
         if self.ft_infer:
-            res = self.infer([word])[0]
+            # Queue the word instead if collecting for batch inference
+            if self._infer_queue is not None:
+                if word not in self._predictions:
+                    self._infer_queue.add(word)
+                # Stands in for the prediction, as processors build on it
+                return _QUEUED
+            res = self._predictions.get(word)
+            if res is None:
+                res = self.infer([word])[0]
             if res is not None:
                 return res
 
         return None
 
-    def convert(self, text: str, convert_num: bool = True) -> str | None:
+    def _prefetch(self, tokens: Iterable[tuple[str, str]]) -> None:
         """
-        Replace a grapheme text line with phonemes.
+        Batch infers all words that would reach the inference stage of lookup.
 
-        :param text: Text line to be converted
-        :param convert_num: True to convert numbers to words
+        Performs a dry-run of lookup on each token, queueing words for
+        inference instead of running the model on them one at a time.
+        Queued words resolve to stand-in phonemes during the dry-run, so the words
+        built from them (hyphenated, compound or stemmed) are not queued as well.
+        Words with cached lookup results are not queued.
+
+        :param tokens: Iterable of (word, pos) tuples
+        """
+        if not self.ft_infer:
+            return
+        self._infer_queue = set()
+        try:
+            for word, pos in tokens:
+                self.lookup(word, pos)
+            queue = sorted(self._infer_queue, key=len)
+        finally:
+            self._infer_queue = None
+        if queue:
+            self._predictions.update(zip(queue, self.infer(queue)))
+
+    def _tokenize(
+        self, lines: list[str], convert_num: bool
+    ) -> tuple[list[str], list[list[str]]]:
         """
+        Normalizes, filters and tokenizes text lines.
+        Each line is filtered once, and the filtered text is only used for tokenizing.
 
+        :param lines: Text lines to be tokenized
+        :param convert_num: True to convert numbers to words
+        :return: Tuple of (normalized text lines, tokens of each line)
+        """
         # Convert numbers, if enabled
         if convert_num:
-            valid_braces(text, raise_on_invalid=True)
-            text = normalize_numbers(text)
+            texts = []
+            for text in lines:
+                valid_braces(text, raise_on_invalid=True)
+                texts.append(normalize_numbers(text))
+        else:
+            texts = list(lines)
 
         # Filter and Tokenize
-        f_text = filter_text(text, preserve_case=True)
-        words = self.h2p.tokenize(f_text)
-        # Run POS tagging
-        tags = self.h2p.get_tags(words)
+        f_texts = filter_many(texts, preserve_case=True)
+        return texts, [self.h2p.tokenize(f_text) for f_text in f_texts]
 
-        # Loop through words and pos tags
+    def _needs_tags(self, words: list[str]) -> bool:
+        """
+        Checks if the pos tags of a tokenized line are needed.
+
+        Tags are only used for heteronyms, and for plural detection
+        of words ending in 's' that are not in the CMU Dictionary.
+
+        :param words: List of tokens
+        """
+        if self.h2p.dict.contains_any(words):
+            return True
+        if self.ft_auto_plural:
+            for word in words:
+                word = word.lower()
+                if word[-1:] == "s" and word not in self.dict:
+                    return True
+        return False
+
+    def _get_tags(self, sentences: list[list[str]]) -> list[list[tuple[str, str]]]:
+        """
+        Gets pos tags of tokenized lines, skipping tagging of lines that do not need it.
+        Words of skipped lines are given None tags.
+
+        :param sentences: List of token lists
+        """
+        results = [[(word, None) for word in words] for words in sentences]
+        indices = [i for i, words in enumerate(sentences) if self._needs_tags(words)]
+        if indices:
+            tags_list = self.h2p.tag_many([sentences[i] for i in indices])
+            for i, tags in zip(indices, tags_list):
+                results[i] = tags
+        return results
+
+    @staticmethod
+    def _iter_words(tags: list[tuple[str, str]]) -> Iterable[tuple[str, str]]:
+        """
+        Yields the tagged words of a line that need phonemes.
+
+        Words within phoneme escape brackets and words without
+        alphabetic characters are skipped.
+
+        :param tags: List of (word, pos) tuples
+        """
         in_bracket = False  # Flag for in phoneme escape bracket
         for word, pos in tags:
             # Check valid
@@ -164,7 +313,18 @@ class G2p:
                     raise ValueError("Unmatched bracket")
             if not contains_alpha(word):
                 continue
+            yield word, pos
 
+    def _render(self, text: str, tags: list[tuple[str, str]]) -> str:
+        """
+        Replaces the tagged words of a text line with phonemes.
+
+        :param text: Text line to be converted
+        :param tags: List of (word, pos) tuples of the line
+        """
+        replacements = []
+        # Loop through words and pos tags
+        for word, pos in self._iter_words(tags):
             # Heteronyms
             if self.h2p.dict.contains(word):
                 phonemes = self.h2p.dict.get_phoneme(word, pos)
@@ -172,8 +332,98 @@ class G2p:
             else:
                 phonemes = self.lookup(word, pos)
             # Format phonemes
-            f_ph = with_cb(phonemes)
-            # Replace word with phonemes
-            text = replace_first(word, f_ph, text)
-        # Return text
-        return text
+            replacements.append((word, with_cb(phonemes)))
+        # Replace words with phonemes, in a single pass over the text
+        return replace_words(replacements, text)
+
+    def convert(self, text: str, convert_num: bool = True) -> str | None:
+        """
+        Replace a grapheme text line with phonemes.
+
+        :param text: Text line to be converted
+        :param convert_num: True to convert numbers to words
+        """
+        texts, sentences = self._tokenize([text], convert_num)
+        # Run POS tagging, if needed
+        tags = self._get_tags(sentences)[0]
+        return self._render(texts[0], tags)
+
+    def convert_batch(self, lines: list[str], convert_num: bool = True) -> list[str]:
+        """
+        Replace a list of grapheme text lines with phonemes.
+
+        Out-of-vocabulary words from all lines are inferred together in
+        length-sorted batches, which is much faster than calling convert()
+        on each line.
+
+        :param lines: Text lines to be converted
+        :param convert_num: True to convert numbers to words
+        """
+        texts, sentences = self._tokenize(lines, convert_num)
+        # Run POS tagging on all lines that need it
+        tags_list = self._get_tags(sentences)
+
+        # Batch infer unresolved words (heteronyms are resolved from the dictionary)
+        tokens = {
+            (word, pos)
+            for tags in tags_list
+            for word, pos in self._iter_words(tags)
+            if not self.h2p.dict.contains(word)
+        }
+        self._prefetch(tokens)
+        try:
+            return [self._render(text, tags) for text, tags in zip(texts, tags_list)]
+        finally:
+            self._predictions.clear()
+
+    def convert_iter(
+        self, lines: Iterable[str], batch_size: int = 64, convert_num: bool = True
+    ) -> Iterator[str]:
+        """
+        Replace a stream of grapheme text lines with phonemes, yielding results in order.
+
+        Lines are converted in batches with convert_batch, so pos tagging and inference
+        of out-of-vocabulary words are shared within a batch. Only one batch is held in
+        memory, so the input can be unbounded, such as a file or socket.
+
+        :param lines: Iterable of text lines to be converted
+        :param batch_size: Number of lines converted together
+        :param convert_num: True to convert numbers to words
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        it = iter(lines)
+        batch = list(islice(it, batch_size))
+        while batch:
+            yield from self.convert_batch(batch, convert_num=convert_num)
+            batch = list(islice(it, batch_size))
+
+    def convert_corpus(
+        self,
+        source,
+        output,
+        workers: int = None,
+        chunk_size: int = 500,
+        convert_num: bool = True,
+    ) -> int:
+        """
+        Replace the grapheme text lines of a corpus with phonemes, using worker processes.
+
+        Workers are forked from this process, sharing the dictionaries and model
+        copy-on-write. Results are written in input order.
+
+        :param source: Path of a text file, a list or tuple of paths, or an iterable of text lines
+        :param output: Path of the output text file, or a writable text stream
+        :param workers: Number of worker processes, defaults to the number of CPUs
+        :param chunk_size: Number of lines sent to a worker at a time
+        :param convert_num: True to convert numbers to words
+        :return: Number of lines converted
+        """
+        return convert_corpus(
+            self,
+            source,
+            output,
+            workers=workers,
+            chunk_size=chunk_size,
+            convert_num=convert_num,
+        )
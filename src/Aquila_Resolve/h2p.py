@@ -1,15 +1,18 @@
+from __future__ import annotations
 from nltk.tokenize import TweetTokenizer
-from nltk import pos_tag
-from nltk import pos_tag_sents
+from nltk.tag.perceptron import PerceptronTagger
+from .cache import LRUCache
 from .data.remote import ensure_nltk
 from .dictionary import Dictionary
-from .filter import filter_text as ft
-from .text.replace import replace_first
+from .filter import filter_text as ft, filter_many
+from .text.replace import replace_words
 from . import format_ph as ph
 
 
 class H2p:
-    def __init__(self, dict_path=None, preload=False, phoneme_format=""):
+    def __init__(
+        self, dict_path=None, preload=False, phoneme_format="", tag_cache_size=100000
+    ):
         """
         Creates a H2p parser
 
@@ -21,6 +24,8 @@ class H2p:
         :type dict_path: str
         :param preload: Preloads the tokenizer and tagger during initialization
         :type preload: bool
+        :param tag_cache_size: Max number of cached results of tag(), None for no limit
+        :type tag_cache_size: int
         """
         # Ensure nltk data is available
         ensure_nltk()
@@ -29,7 +34,8 @@ class H2p:
         self.phoneme_format = phoneme_format
         self.dict = Dictionary(dict_path)
         self.tokenize = TweetTokenizer().tokenize
-        self.get_tags = pos_tag
+        self._tagger = None  # Perceptron tagger, loaded on first use
+        self._tag_cache = LRUCache(max_size=tag_cache_size)
         if preload:
             self.preload()
 
@@ -37,7 +43,24 @@ class H2p:
     def preload(self):
         tokens = self.tokenize("a")
         assert tokens == ["a"]
-        assert pos_tag(tokens)[0][0] == "a"
+        assert self.get_tags(tokens)[0][0] == "a"
+
+    @property
+    def tagger(self) -> PerceptronTagger:
+        """The perceptron tagger, kept for the lifetime of the parser"""
+        if self._tagger is None:
+            self._tagger = PerceptronTagger()
+        return self._tagger
+
+    # Method to get pos tags of a list of words
+    def get_tags(self, words: list[str]) -> list[tuple[str, str]]:
+        if isinstance(words, str):
+            raise TypeError("words: expected a list of strings, got a string")
+        return self.tagger.tag(words)
+
+    # Method to get pos tags of a list of sentences, each a list of words
+    def tag_many(self, sentences: list[list[str]]) -> list[list[tuple[str, str]]]:
+        return [self.get_tags(words) for words in sentences]
 
     # Method to check if a text line contains a heteronym
     def contains_het(self, text):
@@ -46,10 +69,7 @@ class H2p:
         # Tokenize
         words = self.tokenize(text)
         # Check match with dictionary
-        for word in words:
-            if self.dict.contains(word):
-                return True
-        return False
+        return self.dict.contains_any(words)
 
     # Method to replace heteronyms in a text line to phonemes
     def replace_het(self, text):
@@ -57,8 +77,15 @@ class H2p:
         working_text = ft(text, preserve_case=True)
         # Tokenize
         words = self.tokenize(working_text)
+        # Skip tagging if there are no heteronyms
+        if not self.dict.contains_any(words):
+            return text
         # Get pos tags
-        tags = pos_tag(words)
+        tags = self.get_tags(words)
+        return replace_words(self._het_replacements(tags), text)
+
+    # Generates (word, phonemes) replacements for the heteronyms in a list of tags
+    def _het_replacements(self, tags):
         # Loop through words and pos tags
         for word, pos in tags:
             # Skip if word not in dictionary
@@ -67,42 +94,40 @@ class H2p:
             # Get phonemes
             phonemes = self.dict.get_phoneme(word, pos)
             # Format phonemes
-            f_ph = ph.with_cb(ph.to_sds(phonemes))
-            # Replace word with phonemes
-            text = replace_first(word, f_ph, text)
-        return text
+            yield word, ph.with_cb(ph.to_sds(phonemes))
 
     # Replaces heteronyms in a list of text lines
     # Slightly faster than replace_het() called on each line
     def replace_het_list(self, text_list):
         # Filter the text
-        working_text_list = [ft(text, preserve_case=True) for text in text_list]
+        working_text_list = filter_many(text_list, preserve_case=True)
         # Tokenize
         list_sentence_words = [self.tokenize(text) for text in working_text_list]
-        # Get pos tags list
-        tags_list = pos_tag_sents(list_sentence_words)
+        # Get pos tags list, only for lines with heteronyms
+        het_indices = [
+            i
+            for i, words in enumerate(list_sentence_words)
+            if self.dict.contains_any(words)
+        ]
+        tags_list = self.tag_many([list_sentence_words[i] for i in het_indices])
         # Loop through lines
-        for index, line in enumerate(tags_list):
-            # Loop through words and pos tags in tags_list index
-            for word, pos in line:
-                # Skip if word not in dictionary
-                if not self.dict.contains(word):
-                    continue
-                # Get phonemes
-                phonemes = self.dict.get_phoneme(word, pos)
-                # Format phonemes
-                f_ph = ph.with_cb(ph.to_sds(phonemes))
-                # Replace word with phonemes
-                text_list[index] = replace_first(word, f_ph, text_list[index])
+        for index, line in zip(het_indices, tags_list):
+            # Replace heteronyms with phonemes
+            text_list[index] = replace_words(
+                self._het_replacements(line), text_list[index]
+            )
         return text_list
 
     # Method to tag a text line, returns a list of tags
+    # Results are cached, as this is called for single words by the processors
     def tag(self, text):
-        # Filter the text
-        working_text = ft(text, preserve_case=True)
-        # Tokenize
-        words = self.tokenize(working_text)
-        # Get pos tags
-        tags = pos_tag(words)
-        # Only return element 1 of each list
-        return [tag[1] for tag in tags]
+        tags = self._tag_cache.get(text)
+        if tags is None:
+            # Filter the text
+            working_text = ft(text, preserve_case=True)
+            # Tokenize
+            words = self.tokenize(working_text)
+            # Get pos tags, only keeping element 1 of each tuple
+            tags = tuple(tag[1] for tag in self.get_tags(words))
+            self._tag_cache.put(text, tags)
+        return list(tags)
@@ -1,19 +1,149 @@
 from __future__ import annotations
-from .models.dp.phonemizer import Phonemizer
-from .data import PT_FILE
-from .data.remote import ensure_download
+from typing import TYPE_CHECKING
+from .batching import get_token_budget, num_threads
+from .cache import PredictionCache
+from .data import PT_FILE, get_cache_file
+from .data.remote import ensure_download, get_checksum
+from .export import scripted_path
 from .models import MODELS_PATH
+import os
 import sys
+import threading
+from warnings import warn
+
+if TYPE_CHECKING:
+    from .models.dp.phonemizer import Phonemizer
 
 sys.path.insert(0, str(MODELS_PATH))
 
+# Inference backends, numpy runs the model without importing torch (fp32 on cpu only)
+BACKENDS = ("torch", "numpy")
+
 
 class Infer:
-    def __init__(self, device="cpu"):
-        ensure_download()  # Download checkpoint if necessary
-        self.model = Phonemizer.from_checkpoint(PT_FILE, device=device)
+    def __init__(
+        self,
+        device="cpu",
+        cache_path=None,
+        cache_size=100000,
+        lazy=False,
+        precision="fp32",
+        scripted=True,
+        backend="torch",
+        token_budget=None,
+    ):
+        """
+        Creates an inference model.
+
+        :param device: Pytorch device.
+        :param cache_path: Path of a persistent prediction cache (sqlite file), None to disable
+        :param cache_size: Max number of entries in the persistent prediction cache
+        :param lazy: Defers downloading and loading the model checkpoint until the first prediction
+        :param precision: Precision of the model weights, 'fp32' or 'int8' (dynamic quantization, cpu only)
+        :param scripted: Use the TorchScript model exported by Aquila_Resolve.export if present (fp32 only)
+        :param backend: Inference backend, 'torch' or 'numpy'. The numpy backend converts the checkpoint to
+            a weights file in the user cache directory on first use, and then runs without importing torch (fp32 on cpu only)
+        :param token_budget: Max padded tokens of a model batch (input length times decoding steps).
+            None for the budget tuned by Aquila_Resolve.batching for the backend and thread count, or a default
+        """
+        if backend not in BACKENDS:
+            raise ValueError(
+                f"Unsupported backend: {backend}. Supported: {', '.join(BACKENDS)}"
+            )
+        if backend == "numpy" and (device != "cpu" or precision != "fp32"):
+            raise ValueError("The numpy backend only supports fp32 precision on cpu")
+        self.device = device
+        self.precision = precision
+        self.scripted = scripted
+        self.backend = backend
         self.lang = "en_us"
         self.batch_size = 32
+        self.token_budget = token_budget
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.cache = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        if not lazy:
+            self.open_cache()
+            self.load()
+
+    @property
+    def model(self) -> Phonemizer:
+        """Phonemizer model, loaded on first access"""
+        if self._model is None:
+            self.load()
+        return self._model
+
+    @property
+    def loaded(self) -> bool:
+        """True if the model checkpoint is loaded"""
+        return self._model is not None
+
+    def open_cache(self) -> PredictionCache | None:
+        """
+        Opens the persistent prediction cache, if enabled and not already open. Thread-safe.
+        Entries are keyed by the checksum of the checkpoint, which is downloaded if necessary.
+
+        :return: The prediction cache, or None if disabled
+        """
+        if self.cache is None and self.cache_path is not None:
+            with self._load_lock:
+                if self.cache is None:
+                    ensure_download()  # Download checkpoint if necessary
+                    self.cache = PredictionCache(
+                        self.cache_path,
+                        PT_FILE,
+                        max_size=self.cache_size,
+                        variant=None if self.precision == "fp32" else self.precision,
+                    )
+        return self.cache
+
+    def load(self) -> None:
+        """Loads the model checkpoint, if not already loaded. Thread-safe."""
+        with self._load_lock:
+            if self._model is None:
+                ensure_download()  # Download checkpoint if necessary
+                # Deferred import, torch is only loaded with the model
+                from .models.dp.phonemizer import Phonemizer
+
+                if self.token_budget is None:
+                    self.token_budget = get_token_budget(
+                        self.backend, num_threads(self.backend)
+                    )
+                if self.backend == "numpy":
+                    self._model = Phonemizer.from_numpy(
+                        str(PT_FILE), cache_path=get_cache_file(PT_FILE, ".npz")
+                    )
+                    return
+                ts_file = scripted_path(PT_FILE)
+                if (
+                    self.scripted
+                    and self.precision == "fp32"
+                    and os.path.exists(ts_file)
+                ):
+                    try:
+                        self._model = Phonemizer.from_scripted(
+                            ts_file, device=self.device, checksum=self._checksum()
+                        )
+                        return
+                    except ValueError:
+                        warn(
+                            "Scripted model is outdated, loading the checkpoint. "
+                            "Run 'python -m Aquila_Resolve.export' to export it again."
+                        )
+                self._model = Phonemizer.from_checkpoint(
+                    PT_FILE,
+                    device=self.device,
+                    precision=self.precision,
+                    cache_path=get_cache_file(PT_FILE, ".int8.pt"),
+                )
+
+    def _checksum(self) -> str:
+        """Checksum of the model checkpoint"""
+        if self.cache is not None and self.precision == "fp32":
+            return self.cache.checksum  # Already computed, and stored by file stats
+        return get_checksum(PT_FILE)
 
     def __call__(self, text: list[str]) -> list[str]:
         """
@@ -21,8 +151,25 @@ class Infer:
         :param text: list of words
         :return: dict of {word: phonemes}
         """
+        cache = self.open_cache()
+        if cache is None:
+            return self._predict(text)
+        # Only predict words missing from the persistent cache
+        res = cache.get_many(self.lang, text)
+        missing = [word for word in dict.fromkeys(text) if word not in res]
+        if missing:
+            predictions = dict(zip(missing, self._predict(missing)))
+            cache.set_many(self.lang, predictions)
+            res.update(predictions)
+        return [res[word] for word in text]
+
+    def _predict(self, text: list[str]) -> list[str]:
+        """Runs the model on a list of words"""
         res = self.model.phonemise_list(
-            text, lang=self.lang, batch_size=self.batch_size
+            text,
+            lang=self.lang,
+            batch_size=self.batch_size,
+            token_budget=self.token_budget,
         ).phonemes
         # Replace all occurrences of '][' with spaces, remove remaining brackets
         res = [r.replace("][", " ").replace("[", "").replace("]", "") for r in res]
@@ -0,0 +1,154 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .. import Prediction
+from ..preprocessing.text import Preprocessor
+from ..preprocessing.utils import (
+    u_batchify,
+    u_batchify_budget,
+    u_decode_cost,
+    u_product,
+)
+
+
+def _get_lens_util_stop(sequences: np.ndarray, end_index: int) -> np.ndarray:
+    # sequences shape: [N, T], out shape: [N]
+    is_end = sequences == end_index
+    lens = is_end.argmax(axis=1) + 1  # index of the first end index
+    return np.where(is_end.any(axis=1), lens, is_end.shape[1])
+
+
+class BasePredictor(ABC):
+
+    """Tokenizes, batches and decodes model predictions, independent of the model backend."""
+
+    def __init__(self, model, preprocessor: Preprocessor) -> None:
+        """
+        Initializes a predictor with a trained transformer model and a preprocessor.
+
+        Args:
+            model: Trained transformer model.
+            preprocessor (Preprocessor): Preprocessor corresponding to the model configuration.
+        """
+
+        self.model = model
+        self.text_tokenizer = preprocessor.text_tokenizer
+        self.phoneme_tokenizer = preprocessor.phoneme_tokenizer
+
+    @abstractmethod
+    def _generate(
+        self, inputs: np.ndarray, lengths: np.ndarray, start_index: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the model on a batch of padded text tokens.
+
+        Returns: Tuple: Phoneme tokens and phoneme token probabilities, each of shape [N, T].
+        """
+        pass  # pragma: no cover
+
+    @abstractmethod
+    def _get_max_steps_params(self) -> Tuple[float, int]:
+        """
+        Returns: Tuple: Ratio and offset of the decoding step budget of the model.
+        """
+        pass  # pragma: no cover
+
+    def __call__(
+        self,
+        words: List[str],
+        lang: str,
+        batch_size: int = 8,
+        token_budget: Optional[int] = None,
+    ) -> List[Prediction]:
+        """
+        Predicts phonemes for a list of words.
+
+        Args:
+          words (list): List of words to predict.
+          lang (str): Language of texts.
+          batch_size (int): Size of batch for model input to speed up inference.
+          token_budget (int, optional): Max padded tokens of a batch (input length times decoding steps),
+            used in place of batch_size to batch words of different lengths.
+
+        Returns:
+          List[Prediction]: A list of result objects containing (word, phonemes, phoneme_tokens, token_probs, confidence)
+        """
+
+        # Each distinct word is tokenized once, for both the validity check and the model
+        texts = list(dict.fromkeys(words))
+        inputs, lengths = self.text_tokenizer.encode_batch(texts, lang)
+
+        # handle words that result in an empty input to the model
+        special_ids = [
+            self.text_tokenizer.token_to_idx[t]
+            for t in self.text_tokenizer.special_tokens
+        ]
+        valid = (~np.isin(inputs, special_ids)).any(axis=1)
+        predictions = {text: ([], []) for text, v in zip(texts, valid) if not v}
+        order = sorted(np.flatnonzero(valid).tolist(), key=lambda i: len(texts[i]))
+        predictions.update(
+            self._predict_batch(
+                texts, inputs, lengths, order, batch_size, lang, token_budget
+            )
+        )
+
+        results = {}
+        special_tokens = self.phoneme_tokenizer.special_tokens
+        for text, (tokens, probs) in predictions.items():
+            phoneme_tokens = self.phoneme_tokenizer.decode(tokens)
+            results[text] = Prediction(
+                word=text,
+                phonemes="".join(
+                    [t for t in phoneme_tokens if t not in special_tokens]
+                ),
+                phoneme_tokens=phoneme_tokens,
+                confidence=u_product(probs),
+                token_probs=probs,
+            )
+        return [results[word] for word in words]
+
+    def _predict_batch(
+        self,
+        texts: List[str],
+        inputs: np.ndarray,
+        lengths: np.ndarray,
+        order: List[int],
+        batch_size: int,
+        language: str,
+        token_budget: Optional[int] = None,
+    ) -> Dict[str, Tuple[List[int], List[float]]]:
+        """
+        Predicts the rows of the tokenized texts in the given order, in batches.
+
+        Returns: Dict: Text keys with values of (phoneme tokens, phoneme probs).
+        """
+
+        predictions = dict()
+        if token_budget is None:
+            batches = u_batchify(order, batch_size)
+        else:
+            ratio, offset = self._get_max_steps_params()
+            char_repeats = self.text_tokenizer.char_repeats
+            costs = [
+                u_decode_cost(int(lengths[i]), ratio, offset, char_repeats=char_repeats)
+                for i in order
+            ]
+            batches = u_batchify_budget(order, costs, token_budget)
+        start_index = self.phoneme_tokenizer._get_start_index(language)
+        for batch in batches:
+            batch_lengths = lengths[batch]
+            batch_inputs = inputs[batch, : batch_lengths.max()]
+            output_batch, probs_batch = self._generate(
+                batch_inputs, batch_lengths, start_index
+            )
+            seq_lens = _get_lens_util_stop(
+                output_batch, self.phoneme_tokenizer.end_index
+            ).tolist()
+            for i, output, probs, seq_len in zip(
+                batch, output_batch.tolist(), probs_batch.tolist(), seq_lens
+            ):
+                predictions[texts[i]] = (output[:seq_len], probs[:seq_len])
+
+        return predictions
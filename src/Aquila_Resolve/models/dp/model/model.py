@@ -1,10 +1,20 @@
+import json
+import os
+import warnings
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, List, Optional
 
 import torch
 import torch.nn as nn
-from .utils import _make_len_mask, _generate_square_subsequent_mask, PositionalEncoding
+from .utils import (
+    _make_len_mask,
+    _generate_square_subsequent_mask,
+    _get_token_probs,
+    _get_max_steps,
+    PositionalEncoding,
+    CachedDecoderLayer,
+)
 from ..preprocessing.text import Preprocessor
 
 
@@ -54,15 +64,30 @@ class AutoregressiveTransformer(Model):
         decoder_layers=4,
         dropout=0.1,
         heads=1,
+        char_repeats=1,
     ):
         super().__init__()
 
         self.end_index = end_index
+        # Repeats of each input character, the decoding step budget is of the length without repeats
+        self.char_repeats = char_repeats
         self.d_model = d_model
         self.encoder = nn.Embedding(encoder_vocab_size, d_model)
         self.pos_encoder = PositionalEncoding(d_model, dropout)
         self.decoder = nn.Embedding(decoder_vocab_size, d_model)
         self.pos_decoder = PositionalEncoding(d_model, dropout)
+        # Same layout as the default decoder, with layers that can decode incrementally
+        decoder = nn.TransformerDecoder(
+            CachedDecoderLayer(
+                d_model=d_model,
+                nhead=heads,
+                dim_feedforward=d_fft,
+                dropout=dropout,
+                activation="relu",
+            ),
+            num_layers=decoder_layers,
+            norm=nn.LayerNorm(d_model),
+        )
         self.transformer = nn.Transformer(
             d_model=d_model,
             nhead=heads,
@@ -71,12 +96,17 @@ class AutoregressiveTransformer(Model):
             dim_feedforward=d_fft,
             dropout=dropout,
             activation="relu",
+            custom_decoder=decoder,
         )
         self.fc_out = nn.Linear(d_model, decoder_vocab_size)
+        # Causal mask for the decoder, sliced at each step
+        self.register_buffer(
+            "tgt_mask", _generate_square_subsequent_mask(128), persistent=False
+        )
 
     @torch.jit.export
     def generate(
-        self, batch: Dict[str, torch.Tensor], max_len: int = 100
+        self, batch: Dict[str, torch.Tensor], max_len: int = 100, use_cache: bool = True
     ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
         Inference pass on a batch of tokenized texts.
@@ -84,7 +114,10 @@ class AutoregressiveTransformer(Model):
         Args:
           batch (Dict[str, torch.Tensor]): Dictionary containing the input to the model with entries 'text'
                                            and 'start_index'
-          max_len (int): Max steps of the autoregressive inference loop.
+          max_len (int): Max steps of the autoregressive inference loop. Each row is further bounded
+                         by a step budget derived from its input length.
+          use_cache (bool): Whether to decode incrementally, caching the attention keys and values of
+                            previous steps instead of re-running the decoder over the whole prefix.
 
         Returns:
           Tuple: Predictions. The first element is a Tensor of phoneme tokens and the second element
@@ -94,43 +127,163 @@ class AutoregressiveTransformer(Model):
         input = batch["text"]
         start_index = batch["start_index"]
 
-        batch_size = input.size(0)
+        max_steps = _get_max_steps(input, max_len, self.char_repeats)  # shape: [N]
         input = input.transpose(0, 1)  # shape: [T, N]
         src_pad_mask = _make_len_mask(input).to(input.device)
         with torch.no_grad():
             input = self.encoder(input)
             input = self.pos_encoder(input)
             input = self.transformer.encoder(input, src_key_padding_mask=src_pad_mask)
-            out_indices = start_index.unsqueeze(0)
-            out_logits = []
-            for i in range(max_len):
-                tgt_mask = _generate_square_subsequent_mask(i + 1).to(input.device)
-                output = self.decoder(out_indices)
-                output = self.pos_decoder(output)
-                output = self.transformer.decoder(
-                    output,
-                    input,
-                    memory_key_padding_mask=src_pad_mask,
-                    tgt_mask=tgt_mask,
+            if use_cache:
+                out_indices, out_logits = self._decode_cached(
+                    input, src_pad_mask, start_index, max_steps
+                )
+            else:
+                out_indices, out_logits = self._decode(
+                    input, src_pad_mask, start_index, max_steps
                 )
-                output = self.fc_out(output)  # shape: [T, N, V]
-                out_tokens = output.argmax(2)[-1:, :]
-                out_logits.append(output[-1:, :, :])
-
-                out_indices = torch.cat([out_indices, out_tokens], dim=0)
-                stop_rows, _ = torch.max(out_indices == self.end_index, dim=0)
-                if torch.sum(stop_rows) == batch_size:
-                    break
 
         out_indices = out_indices.transpose(0, 1)  # out shape [N, T]
         out_logits = torch.cat(out_logits, dim=0).transpose(0, 1)  # out shape [N, T, V]
-        out_logits = out_logits.softmax(-1)
-        out_probs = torch.ones((out_indices.size(0), out_indices.size(1)))
-        for i in range(out_indices.size(0)):
-            for j in range(0, out_indices.size(1) - 1):
-                out_probs[i, j + 1] = out_logits[i, j].max()
+        out_probs = _get_token_probs(out_logits)
         return out_indices, out_probs
 
+    def _decode(
+        self,
+        memory: torch.Tensor,
+        src_pad_mask: torch.Tensor,
+        start_index: torch.Tensor,
+        max_steps: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[torch.Tensor]]:
+        """
+        Greedy decoding, re-running the decoder over the whole prefix at every step.
+        Finished rows, and rows that used up their step budget, are removed from the active batch.
+
+        Returns: Tuple: Output indices of shape [T, N] and a list of the logits of each step.
+        """
+
+        batch_size = memory.size(1)
+        active = torch.arange(batch_size, device=memory.device)
+        out_indices = start_index.unsqueeze(0)
+        out_logits = []
+        for i in range(int(max_steps.max())):
+            tgt_mask = self._get_tgt_mask(i + 1)
+            output = self.decoder(out_indices.index_select(1, active))
+            output = self.pos_decoder(output)
+            output = self.transformer.decoder(
+                output,
+                memory,
+                memory_key_padding_mask=src_pad_mask,
+                tgt_mask=tgt_mask,
+            )
+            output = self.fc_out(output[-1])  # shape: [N_active, V]
+            out_tokens, output = self._scatter_step(output, active, batch_size)
+            out_logits.append(output)
+            out_indices = torch.cat([out_indices, out_tokens], dim=0)
+
+            # Drop finished rows from the active batch
+            keep = (out_tokens[0].index_select(0, active) != self.end_index) & (
+                max_steps.index_select(0, active) > i + 1
+            )
+            if not bool(keep.all()):
+                active = active[keep]
+                if active.numel() == 0:
+                    break
+                memory = memory[:, keep]
+                src_pad_mask = src_pad_mask[keep]
+        return out_indices, out_logits
+
+    def _decode_cached(
+        self,
+        memory: torch.Tensor,
+        src_pad_mask: torch.Tensor,
+        start_index: torch.Tensor,
+        max_steps: torch.Tensor,
+    ) -> Tuple[torch.Tensor, List[torch.Tensor]]:
+        """
+        Incremental greedy decoding. The self-attention keys and values of each decoder layer
+        and the projected encoder memory are cached, so every step only computes the newest position.
+        Finished rows, and rows that used up their step budget, are removed from the active batch.
+
+        Returns: Tuple: Output indices of shape [T, N] and a list of the logits of each step.
+        """
+
+        batch_size = memory.size(1)
+        active = torch.arange(batch_size, device=memory.device)
+        memory = memory.transpose(0, 1)  # shape: [N, S, E]
+        memory_kv: List[Tuple[torch.Tensor, torch.Tensor]] = []
+        for mod in self.transformer.decoder.layers:
+            memory_kv.append(mod.project_memory(memory))
+        self_kv: List[Tuple[Optional[torch.Tensor], Optional[torch.Tensor]]] = [
+            (None, None) for _ in memory_kv
+        ]
+        out_indices = start_index.unsqueeze(0)
+        out_logits = []
+        for i in range(int(max_steps.max())):
+            output = (
+                self.decoder(out_indices[-1].index_select(0, active))
+                + self.pos_decoder.scale * self.pos_decoder.pe[i]
+            )
+            output = self.pos_decoder.dropout(output).unsqueeze(1)  # shape: [N, 1, E]
+            for j, layer in enumerate(self.transformer.decoder.layers):
+                memory_k, memory_v = memory_kv[j]
+                self_k, self_v = self_kv[j]
+                output, self_k, self_v = layer.forward_cached(
+                    output, self_k, self_v, memory_k, memory_v, src_pad_mask
+                )
+                self_kv[j] = (self_k, self_v)
+            if self.transformer.decoder.norm is not None:
+                output = self.transformer.decoder.norm(output)
+            output = self.fc_out(output[:, 0])  # shape: [N_active, V]
+            out_tokens, output = self._scatter_step(output, active, batch_size)
+            out_logits.append(output)
+            out_indices = torch.cat([out_indices, out_tokens], dim=0)
+
+            # Drop finished rows from the active batch and caches
+            keep = (out_tokens[0].index_select(0, active) != self.end_index) & (
+                max_steps.index_select(0, active) > i + 1
+            )
+            if not bool(keep.all()):
+                active = active[keep]
+                if active.numel() == 0:
+                    break
+                src_pad_mask = src_pad_mask[keep]
+                memory_kv = [(k[keep], v[keep]) for k, v in memory_kv]
+                self_kv = [
+                    (k[keep] if k is not None else k, v[keep] if v is not None else v)
+                    for k, v in self_kv
+                ]
+        return out_indices, out_logits
+
+    def _get_tgt_mask(self, size: int) -> torch.Tensor:
+        """
+        Returns the causal mask for a target sequence of the given size, sliced from the
+        precomputed mask buffer. Larger masks are built for the call, the buffer is never
+        reassigned, so the model can decode in several threads.
+        """
+
+        if size > self.tgt_mask.size(0):
+            return _generate_square_subsequent_mask(size).to(self.tgt_mask.device)
+        return self.tgt_mask[:size, :size]
+
+    def _scatter_step(
+        self, logits: torch.Tensor, active: torch.Tensor, batch_size: int
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Scatters the logits of the active rows of a decoding step back into the full batch.
+        Finished rows are filled with the end index and zero logits.
+
+        Returns: Tuple: Step tokens of shape [1, N] and step logits of shape [1, N, V].
+        """
+
+        step_logits = logits.new_zeros((batch_size, logits.size(-1)))
+        step_logits[active] = logits
+        step_tokens = torch.full(
+            (batch_size,), self.end_index, dtype=torch.long, device=logits.device
+        )
+        step_tokens[active] = logits.argmax(-1)
+        return step_tokens.unsqueeze(0), step_logits.unsqueeze(0)
+
     @classmethod
     def from_config(cls, config: Dict[str, Any]) -> "AutoregressiveTransformer":
         """
@@ -153,6 +306,7 @@ class AutoregressiveTransformer(Model):
             decoder_layers=config["model"]["layers"],
             dropout=config["model"]["dropout"],
             heads=config["model"]["heads"],
+            char_repeats=config["preprocessing"]["char_repeats"],
         )
 
 
@@ -174,8 +328,35 @@ def create_model(model_type: ModelType, config: Dict[str, Any]) -> Model:
     return AutoregressiveTransformer.from_config(config)
 
 
+# Supported inference precisions, int8 applies dynamic quantization (cpu only)
+PRECISIONS = ("fp32", "int8")
+# Version of the quantized checkpoint cache, cache files of other versions are rebuilt
+_QUANTIZED_VERSION = 1
+# Version of the scripted model file, which freezes the decoding code (generate and its helpers)
+# into its graph. Bumped whenever that code changes, files of other versions are not loaded
+_SCRIPTED_VERSION = 1
+
+
+def quantize_model(model: Model) -> Model:
+    """
+    Applies dynamic int8 quantization to the Linear layers of a model, for cpu inference.
+    Weights are stored as int8 and activations are quantized on the fly. The projections
+    of the attention layers are not quantized, as they are used as float weights.
+
+    Args:
+        model (Model): Model in eval mode.
+
+    Returns: Model: Quantized model.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
 def load_checkpoint(
-    checkpoint_path: str, device: str = "cpu"
+    checkpoint_path: str,
+    device: str = "cpu",
+    precision: str = "fp32",
+    cache: bool = True,
+    cache_path: Optional[str] = None,
 ) -> Tuple[Model, Dict[str, Any]]:
     """
     Initializes a model from a checkpoint (.pt file).
@@ -183,12 +364,26 @@ def load_checkpoint(
     Args:
         checkpoint_path (str): Path to checkpoint file (.pt).
         device (str): Device to put the model to ('cpu' or 'cuda').
+        precision (str): Precision of the model weights ('fp32' or 'int8', int8 is cpu only).
+        cache (bool): With int8 precision, reads and writes the quantized checkpoint in a cache file.
+        cache_path (str, optional): Path of the quantized checkpoint cache file,
+            defaults to beside the checkpoint (.int8.pt).
 
     Returns: Tuple: The first element is a Model (the loaded model)
              and the second element is a dictionary (config).
     """
 
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unsupported precision: {precision}. Supported: {', '.join(PRECISIONS)}"
+        )
     device = torch.device(device)
+    if precision == "int8":
+        if device.type != "cpu":
+            raise ValueError(f"int8 precision is only supported on cpu, not {device}")
+        if cache_path is None:
+            cache_path = os.path.splitext(str(checkpoint_path))[0] + ".int8.pt"
+        return _load_quantized(str(checkpoint_path), cache, str(cache_path))
     checkpoint = torch.load(checkpoint_path, map_location=device)
     model_type = checkpoint["config"]["model"]["type"]
     model_type = ModelType(model_type)
@@ -196,3 +391,124 @@ def load_checkpoint(
     model.load_state_dict(checkpoint["model"])
     model.eval()
     return model, checkpoint
+
+
+def _load_quantized(
+    checkpoint_path: str, cache: bool, cache_path: str
+) -> Tuple[Model, Dict[str, Any]]:
+    """
+    Loads a checkpoint with dynamic int8 quantization, from the cache file if it is current.
+    The cache file is a checkpoint with the quantized state dict, stamped with the size
+    and modification time of the source checkpoint.
+    """
+
+    stat = os.stat(checkpoint_path)
+    stamp = (_QUANTIZED_VERSION, stat.st_size, stat.st_mtime_ns)
+    if cache:
+        try:
+            checkpoint = torch.load(cache_path, map_location="cpu")
+            if checkpoint.get("source") == stamp:
+                model_type = ModelType(checkpoint["config"]["model"]["type"])
+                model = create_model(model_type, config=checkpoint["config"]).eval()
+                model = quantize_model(model)
+                model.load_state_dict(checkpoint["model"])
+                return model, checkpoint
+        except (OSError, RuntimeError, KeyError, ValueError, EOFError):
+            pass  # Missing or invalid cache, quantized again
+
+    model, checkpoint = load_checkpoint(checkpoint_path, device="cpu")
+    model = quantize_model(model)
+    # Optimizer state is only needed for training
+    checkpoint = {k: v for k, v in checkpoint.items() if k != "optimizer"}
+    checkpoint["model"] = model.state_dict()
+    checkpoint["source"] = stamp
+    if cache:
+        # Written to a temporary file then renamed, so readers never see a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            torch.save(checkpoint, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:  # Read-only location, quantized again on every load
+            warnings.warn(f"Could not write the quantized checkpoint cache: {e}")
+    return model, checkpoint
+
+
+def script_model(model: Model) -> torch.jit.ScriptModule:
+    """
+    Compiles a model with TorchScript, freezing its weights and submodules as constants.
+    Only fp32 models can be scripted, the quantized Linear layers break the encoder.
+
+    Args:
+        model (Model): Model to compile.
+
+    Returns: ScriptModule: Frozen module, with the generate method preserved.
+    """
+    return torch.jit.freeze(
+        torch.jit.script(model.eval()), preserved_attrs=["generate"]
+    )
+
+
+def save_scripted(checkpoint_path: str, output_path: str, checksum: str = "") -> None:
+    """
+    Compiles the model of a checkpoint with TorchScript and saves it with its config.
+
+    Args:
+        checkpoint_path (str): Path to checkpoint file (.pt).
+        output_path (str): Path of the scripted model file (.ts).
+        checksum (str): Checksum of the checkpoint, stored to detect a stale scripted model.
+    """
+
+    model, checkpoint = load_checkpoint(checkpoint_path, device="cpu")
+    extra_files = {
+        "version": str(_SCRIPTED_VERSION),
+        "checksum": checksum,
+        "config.json": json.dumps(checkpoint["config"]),
+    }
+    if "phoneme_dict" in checkpoint:
+        extra_files["phoneme_dict.json"] = json.dumps(checkpoint["phoneme_dict"])
+    # Written to a temporary file then renamed, so readers never see a partial file
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    torch.jit.save(script_model(model), tmp_path, _extra_files=extra_files)
+    os.replace(tmp_path, output_path)
+
+
+def load_scripted(
+    scripted_path: str, device: str = "cpu", checksum: Optional[str] = None
+) -> Tuple[torch.jit.ScriptModule, Dict[str, Any]]:
+    """
+    Loads a model saved by save_scripted.
+
+    Args:
+        scripted_path (str): Path of the scripted model file (.ts).
+        device (str): Device to put the model to ('cpu' or 'cuda').
+        checksum (str, optional): Checksum of the source checkpoint, raises ValueError
+            if the scripted model was exported from a different checkpoint.
+
+    Raises: ValueError: If the scripted model was exported by another version of the decoding code,
+            or from a different checkpoint.
+
+    Returns: Tuple: The first element is the scripted model and the second element
+             is a dictionary with the config, preprocessor and phoneme dict, as in a checkpoint.
+    """
+
+    extra_files = {
+        "version": b"",
+        "checksum": b"",
+        "config.json": b"",
+        "phoneme_dict.json": b"",
+    }
+    model = torch.jit.load(scripted_path, map_location=device, _extra_files=extra_files)
+    if extra_files["version"].decode() != str(_SCRIPTED_VERSION):
+        raise ValueError(
+            f"Scripted model {scripted_path} was exported by another version of the model code"
+        )
+    if checksum is not None and extra_files["checksum"].decode() != checksum:
+        raise ValueError(
+            f"Scripted model {scripted_path} was not exported from the current checkpoint"
+        )
+    config = json.loads(extra_files["config.json"])
+    checkpoint = {"config": config, "preprocessor": Preprocessor.from_config(config)}
+    if extra_files["phoneme_dict.json"]:
+        checkpoint["phoneme_dict"] = json.loads(extra_files["phoneme_dict.json"])
+    return model, checkpoint
@@ -0,0 +1,376 @@
+# Inference of the autoregressive transformer with NumPy, without importing torch
+import json
+import math
+import os
+import warnings
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from .base_predictor import BasePredictor
+from ..preprocessing.text import Preprocessor
+
+# Version of the converted weights file, files of other versions are converted again
+_NUMPY_VERSION = 1
+# Epsilon of the torch LayerNorm layers
+_LAYER_NORM_EPS = 1e-5
+
+
+def convert_checkpoint(checkpoint_path: str) -> Dict[str, np.ndarray]:
+    """
+    Converts a model checkpoint (.pt file) to NumPy arrays. This is the only step that needs torch.
+
+    Args:
+        checkpoint_path (str): Path to checkpoint file (.pt).
+
+    Returns: Dict: Float32 weights by state dict key, and the config, phoneme dict and
+             decoding step budget of the model.
+    """
+
+    # Deferred import, the converted weights are read without torch
+    from .model import load_checkpoint
+    from .utils import MAX_STEPS_RATIO, MAX_STEPS_OFFSET
+
+    model, checkpoint = load_checkpoint(checkpoint_path, device="cpu")
+    arrays = {
+        key: value.detach().numpy().astype(np.float32)
+        for key, value in model.state_dict().items()
+        if not key.endswith(".pe")  # Positional encodings are computed on load
+    }
+    arrays["_config"] = np.array(json.dumps(checkpoint["config"]))
+    if "phoneme_dict" in checkpoint:
+        arrays["_phoneme_dict"] = np.array(json.dumps(checkpoint["phoneme_dict"]))
+    arrays["_max_steps"] = np.array([MAX_STEPS_RATIO, MAX_STEPS_OFFSET])
+    return arrays
+
+
+def load_numpy(
+    checkpoint_path: str, cache: bool = True, cache_path: Optional[str] = None
+) -> Tuple["NumpyTransformer", Dict[str, Any]]:
+    """
+    Loads a checkpoint as a NumPy model, from the converted weights file (.npz) if it is current.
+    Otherwise the checkpoint is converted with torch, and the weights file written.
+
+    Args:
+        checkpoint_path (str): Path to checkpoint file (.pt).
+        cache (bool): Whether to read and write the converted weights file.
+        cache_path (str, optional): Path of the converted weights file, defaults to beside the checkpoint.
+
+    Returns: Tuple: The first element is the NumPy model and the second element
+             is a dictionary with the config, preprocessor and phoneme dict, as in a checkpoint.
+    """
+
+    npz_path = cache_path or os.path.splitext(checkpoint_path)[0] + ".npz"
+    stat = os.stat(checkpoint_path)
+    stamp = [_NUMPY_VERSION, stat.st_size, stat.st_mtime_ns]
+    arrays = None
+    if cache:
+        try:
+            with np.load(npz_path) as f:
+                if f["_source"].tolist() == stamp:
+                    arrays = {key: f[key] for key in f.files}
+        except (OSError, KeyError, ValueError, EOFError):
+            pass  # Missing or invalid weights file, converted again
+
+    if arrays is None:
+        arrays = convert_checkpoint(checkpoint_path)
+        arrays["_source"] = np.array(stamp, dtype=np.int64)
+        if cache:
+            # Written to a temporary file then renamed, so readers never see a partial file
+            tmp_path = f"{npz_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(npz_path)), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp_path, npz_path)
+            except (
+                OSError
+            ) as e:  # Read-only location, converted with torch on every load
+                warnings.warn(f"Could not write the NumPy weights file: {e}")
+
+    config = json.loads(str(arrays["_config"]))
+    preprocessor = Preprocessor.from_config(config)
+    checkpoint = {"config": config, "preprocessor": preprocessor}
+    if "_phoneme_dict" in arrays:
+        checkpoint["phoneme_dict"] = json.loads(str(arrays["_phoneme_dict"]))
+    model = NumpyTransformer(
+        arrays,
+        heads=config["model"]["heads"],
+        layers=config["model"]["layers"],
+        end_index=preprocessor.phoneme_tokenizer.end_index,
+        char_repeats=preprocessor.text_tokenizer.char_repeats,
+    )
+    return model, checkpoint
+
+
+def _positional_encoding(max_len: int, d_model: int) -> np.ndarray:
+    # Same as PositionalEncoding, shape: [max_len, E]
+    pe = np.zeros((max_len, d_model), dtype=np.float32)
+    position = np.arange(max_len, dtype=np.float32)[:, None]
+    div_term = np.exp(
+        np.arange(0, d_model, 2, dtype=np.float32)
+        * np.float32(-math.log(10000.0) / d_model)
+    )
+    pe[:, 0::2] = np.sin(position * div_term)
+    pe[:, 1::2] = np.cos(position * div_term)
+    return pe
+
+
+def _layer_norm(x: np.ndarray, weight: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    mean = x.mean(-1, keepdims=True)
+    x = x - mean
+    var = (x * x).mean(-1, keepdims=True)
+    return x / np.sqrt(var + _LAYER_NORM_EPS) * weight + bias
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = np.exp(x - x.max(-1, keepdims=True))
+    return x / x.sum(-1, keepdims=True)
+
+
+def _split_heads(x: np.ndarray, heads: int) -> np.ndarray:
+    # shape: [N, T, E] -> [N, H, T, E / H]
+    n, t, e = x.shape
+    return x.reshape(n, t, heads, e // heads).transpose(0, 2, 1, 3)
+
+
+def _merge_heads(x: np.ndarray) -> np.ndarray:
+    # shape: [N, H, T, E / H] -> [N, T, E]
+    n, h, t, d = x.shape
+    return x.transpose(0, 2, 1, 3).reshape(n, t, h * d)
+
+
+def _attend(
+    q: np.ndarray, k: np.ndarray, v: np.ndarray, key_padding_mask: np.ndarray = None
+) -> np.ndarray:
+    # q shape: [N, H, T, D], k and v shape: [N, H, S, D], key_padding_mask shape: [N, S]
+    scores = np.matmul(q / np.float32(math.sqrt(q.shape[-1])), k.swapaxes(-2, -1))
+    if key_padding_mask is not None:
+        scores = np.where(key_padding_mask[:, None, None, :], -np.inf, scores)
+    return np.matmul(_softmax(scores), v)
+
+
+class NumpyTransformer:
+    def __init__(
+        self,
+        weights: Dict[str, np.ndarray],
+        heads: int,
+        layers: int,
+        end_index: int,
+        char_repeats: int = 1,
+    ) -> None:
+        """
+        Greedy inference of an AutoregressiveTransformer with NumPy, from its converted weights.
+        Follows AutoregressiveTransformer.generate with incremental decoding, in eval mode.
+
+        Args:
+            weights (Dict[str, np.ndarray]): Weights of the model by state dict key, from convert_checkpoint.
+            heads (int): Number of attention heads.
+            layers (int): Number of encoder and decoder layers.
+            end_index (int): Index of the end token.
+            char_repeats (int): Repeats of each input character, the decoding step budget
+                is of the length without repeats.
+        """
+
+        self.heads = heads
+        self.end_index = end_index
+        self.char_repeats = char_repeats
+        # Linear weights are transposed once, so layers multiply without copies
+        self.weights = {
+            key: (
+                np.ascontiguousarray(value.T)
+                if value.ndim == 2 and key not in ("encoder.weight", "decoder.weight")
+                else value
+            )
+            for key, value in weights.items()
+            if not key.startswith("_")
+        }
+        self.max_steps_ratio, self.max_steps_offset = weights["_max_steps"].tolist()
+        self.encoder_layers = [
+            f"transformer.encoder.layers.{i}." for i in range(layers)
+        ]
+        self.decoder_layers = [
+            f"transformer.decoder.layers.{i}." for i in range(layers)
+        ]
+        self.d_model = self.weights["encoder.weight"].shape[1]
+        self.pe = _positional_encoding(256, self.d_model)
+
+    def _get_pe(self, size: int) -> np.ndarray:
+        """Returns the positional encodings of the first positions, growing the table if needed."""
+        if size > self.pe.shape[0]:
+            self.pe = _positional_encoding(2 * size, self.d_model)
+        return self.pe[:size]
+
+    def _linear(self, x: np.ndarray, prefix: str) -> np.ndarray:
+        return (
+            np.matmul(x, self.weights[prefix + "weight"])
+            + self.weights[prefix + "bias"]
+        )
+
+    def _norm(self, x: np.ndarray, prefix: str) -> np.ndarray:
+        return _layer_norm(
+            x, self.weights[prefix + "weight"], self.weights[prefix + "bias"]
+        )
+
+    def _feed_forward(self, x: np.ndarray, prefix: str, norm: str) -> np.ndarray:
+        out = np.maximum(self._linear(x, prefix + "linear1."), 0)
+        return self._norm(x + self._linear(out, prefix + "linear2."), prefix + norm)
+
+    def _encode(self, text: np.ndarray, pad_mask: np.ndarray) -> np.ndarray:
+        # text shape: [N, T], out shape: [N, T, E]
+        w = self.weights
+        x = w["encoder.weight"][text]
+        x = x + w["pos_encoder.scale"] * self._get_pe(text.shape[1])
+        for prefix in self.encoder_layers:
+            q, k, v = np.split(self._linear(x, prefix + "self_attn.in_proj_"), 3, -1)
+            out = _attend(
+                _split_heads(q, self.heads),
+                _split_heads(k, self.heads),
+                _split_heads(v, self.heads),
+                pad_mask,
+            )
+            out = self._linear(_merge_heads(out), prefix + "self_attn.out_proj.")
+            x = self._norm(x + out, prefix + "norm1.")
+            x = self._feed_forward(x, prefix, "norm2.")
+        return self._norm(x, "transformer.encoder.norm.")
+
+    def generate(
+        self, text: np.ndarray, start_index: np.ndarray, max_len: int = 100
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Inference pass on a batch of tokenized texts.
+
+        Args:
+          text (np.ndarray): Padded text tokens, shape: [N, T].
+          start_index (np.ndarray): Phoneme start index of each row, shape: [N].
+          max_len (int): Max steps of the autoregressive inference loop. Each row is further bounded
+                         by a step budget derived from its input length.
+
+        Returns:
+          Tuple: Predictions. The first element is an array of phoneme tokens and the second element
+                 is an array of phoneme token probabilities.
+        """
+
+        w, heads = self.weights, self.heads
+        batch_size = text.shape[0]
+        text_len = (text != 0).sum(axis=1)
+        # Length without repeats, the start and end tokens are not repeated
+        text_len = (text_len + 2 * (self.char_repeats - 1)) // self.char_repeats
+        max_steps = np.minimum(
+            np.ceil(text_len * self.max_steps_ratio).astype(np.int64)
+            + int(self.max_steps_offset),
+            max_len,
+        )
+        steps = int(max_steps.max())
+        pad_mask = text == 0
+        memory = self._encode(text, pad_mask)
+
+        # Projected memory and self-attention keys and values of each decoder layer
+        memory_kv, self_kv = [], []
+        e = self.d_model
+        for prefix in self.decoder_layers:
+            weight = w[prefix + "multihead_attn.in_proj_weight"]
+            bias = w[prefix + "multihead_attn.in_proj_bias"]
+            k = np.matmul(memory, weight[:, e : 2 * e]) + bias[e : 2 * e]
+            v = np.matmul(memory, weight[:, 2 * e :]) + bias[2 * e :]
+            memory_kv.append((_split_heads(k, heads), _split_heads(v, heads)))
+            shape = (batch_size, heads, steps, e // heads)
+            self_kv.append((np.empty(shape, np.float32), np.empty(shape, np.float32)))
+
+        active = np.arange(batch_size)
+        pe = self._get_pe(steps) * w["pos_decoder.scale"]
+        out_tokens = np.full((batch_size, steps + 1), self.end_index, dtype=np.int64)
+        out_tokens[:, 0] = start_index
+        # Finished rows have zero logits in the torch model, so a uniform probability
+        vocab_size = w["fc_out.bias"].shape[0]
+        out_probs = np.full((batch_size, steps + 1), 1.0 / vocab_size, np.float32)
+        out_probs[:, 0] = 1.0
+        for i in range(steps):
+            x = (w["decoder.weight"][out_tokens[active, i]] + pe[i])[:, None]
+            for j, prefix in enumerate(self.decoder_layers):
+                x = self._decoder_step(x, i, prefix, self_kv[j], memory_kv[j], pad_mask)
+            x = self._norm(x, "transformer.decoder.norm.")
+            logits = self._linear(x[:, 0], "fc_out.")  # shape: [N_active, V]
+            tokens = logits.argmax(-1)
+            out_tokens[active, i + 1] = tokens
+            out_probs[active, i + 1] = _softmax(logits).max(-1)
+
+            # Drop finished rows from the active batch and caches
+            keep = (tokens != self.end_index) & (max_steps[active] > i + 1)
+            if not keep.all():
+                active = active[keep]
+                if active.size == 0:
+                    out_tokens, out_probs = (
+                        out_tokens[:, : i + 2],
+                        out_probs[:, : i + 2],
+                    )
+                    break
+                pad_mask = pad_mask[keep]
+                memory_kv = [(k[keep], v[keep]) for k, v in memory_kv]
+                self_kv = [(k[keep], v[keep]) for k, v in self_kv]
+        return out_tokens, out_probs
+
+    def _decoder_step(
+        self,
+        x: np.ndarray,
+        step: int,
+        prefix: str,
+        self_kv: Tuple[np.ndarray, np.ndarray],
+        memory_kv: Tuple[np.ndarray, np.ndarray],
+        memory_key_padding_mask: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Runs a decoder layer on the newest position only, writing its self-attention keys
+        and values to the cache. Same as CachedDecoderLayer.forward_cached.
+
+        Returns: np.ndarray: Layer output, shape: [N, 1, E].
+        """
+
+        heads = self.heads
+        q, k, v = np.split(self._linear(x, prefix + "self_attn.in_proj_"), 3, -1)
+        self_k, self_v = self_kv
+        self_k[:, :, step] = _split_heads(k, heads)[:, :, 0]
+        self_v[:, :, step] = _split_heads(v, heads)[:, :, 0]
+        out = _attend(
+            _split_heads(q, heads),
+            self_k[:, :, : step + 1],
+            self_v[:, :, : step + 1],
+        )
+        out = self._linear(_merge_heads(out), prefix + "self_attn.out_proj.")
+        x = self._norm(x + out, prefix + "norm1.")
+
+        e = self.d_model
+        weight = self.weights[prefix + "multihead_attn.in_proj_weight"]
+        bias = self.weights[prefix + "multihead_attn.in_proj_bias"]
+        q = np.matmul(x, weight[:, :e]) + bias[:e]
+        memory_k, memory_v = memory_kv
+        out = _attend(
+            _split_heads(q, heads), memory_k, memory_v, memory_key_padding_mask
+        )
+        out = self._linear(_merge_heads(out), prefix + "multihead_attn.out_proj.")
+        x = self._norm(x + out, prefix + "norm2.")
+        return self._feed_forward(x, prefix, "norm3.")
+
+
+class NumpyPredictor(BasePredictor):
+    """Performs model predictions on a batch of inputs with a NumPy model, same as Predictor."""
+
+    def __init__(self, model: NumpyTransformer, preprocessor: Preprocessor) -> None:
+        """
+        Initializes a NumpyPredictor object with a converted transformer model and a preprocessor.
+
+        Args:
+            model (NumpyTransformer): Converted transformer model.
+            preprocessor (Preprocessor): Preprocessor corresponding to the model configuration.
+        """
+
+        super().__init__(model, preprocessor)
+
+    def _generate(
+        self, inputs: np.ndarray, lengths: np.ndarray, start_index: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        start_inds = np.full(len(inputs), start_index, dtype=np.int64)
+        return self.model.generate(inputs, start_inds)
+
+    def _get_max_steps_params(self) -> Tuple[float, int]:
+        return self.model.max_steps_ratio, int(self.model.max_steps_offset)
@@ -1,5 +1,14 @@
 import math
+from typing import Optional, Tuple
+
 import torch
+import torch.nn.functional as F
+
+# Step budget of the decoder relative to the input length (in tokens, including start and end,
+# with characters not repeated). Fit on the cmudict length distribution, the phonemes (with end token)
+# of every entry fit within ceil(ratio * input length) + offset steps.
+MAX_STEPS_RATIO = 1.0
+MAX_STEPS_OFFSET = 11
 
 
 class PositionalEncoding(torch.nn.Module):
@@ -42,8 +51,167 @@ def _make_len_mask(inp: torch.Tensor) -> torch.Tensor:
     return (inp == 0).transpose(0, 1)
 
 
+def _get_max_steps(
+    inp: torch.Tensor,
+    max_len: int,
+    char_repeats: int = 1,
+    ratio: float = MAX_STEPS_RATIO,
+    offset: int = MAX_STEPS_OFFSET,
+) -> torch.Tensor:
+    # inp shape: [N, T], out shape: [N]
+    # The step budget constants are default arguments, as TorchScript can not read globals
+    text_len = (inp != 0).sum(dim=1)
+    # Length without repeats, the start and end tokens are not repeated
+    text_len = torch.div(
+        text_len + 2 * (char_repeats - 1), char_repeats, rounding_mode="floor"
+    )
+    max_steps = torch.ceil(text_len * ratio).long() + offset
+    return max_steps.clamp(max=max_len)
+
+
 def _get_len_util_stop(sequence: torch.Tensor, end_index: int) -> int:
-    for i, val in enumerate(sequence):
-        if val == end_index:
-            return i + 1
+    stops = (sequence == end_index).nonzero()
+    if stops.numel() > 0:
+        return int(stops[0]) + 1
     return len(sequence)  # pragma: no cover
+
+
+def _get_lens_util_stop(sequences: torch.Tensor, end_index: int) -> torch.Tensor:
+    # sequences shape: [N, T], out shape: [N]
+    is_end = sequences == end_index
+    lens = is_end.int().argmax(dim=1) + 1  # index of the first end index
+    return torch.where(is_end.any(dim=1), lens, torch.full_like(lens, is_end.size(1)))
+
+
+def _get_token_probs(logits: torch.Tensor) -> torch.Tensor:
+    # logits shape: [N, T, V], out shape: [N, T + 1] (start token has probability 1)
+    probs = torch.ones((logits.size(0), logits.size(1) + 1), device=logits.device)
+    probs[:, 1:] = logits.softmax(-1).max(dim=-1).values
+    return probs
+
+
+def _split_heads(x: torch.Tensor, heads: int) -> torch.Tensor:
+    # shape: [N, T, E] -> [N, H, T, E / H]
+    n, t, e = x.size()
+    return x.view(n, t, heads, e // heads).transpose(1, 2)
+
+
+def _merge_heads(x: torch.Tensor) -> torch.Tensor:
+    # shape: [N, H, T, E / H] -> [N, T, E]
+    n, h, t, d = x.size()
+    return x.transpose(1, 2).reshape(n, t, h * d)
+
+
+def _attend(
+    q: torch.Tensor,
+    k: torch.Tensor,
+    v: torch.Tensor,
+    key_padding_mask: Optional[torch.Tensor] = None,
+) -> torch.Tensor:
+    # q shape: [N, H, 1, D], k and v shape: [N, H, S, D], key_padding_mask shape: [N, S]
+    scores = torch.matmul(q / math.sqrt(q.size(-1)), k.transpose(-2, -1))
+    if key_padding_mask is not None:
+        scores = scores.masked_fill(
+            key_padding_mask.unsqueeze(1).unsqueeze(2), float("-inf")
+        )
+    return torch.matmul(scores.softmax(-1), v)
+
+
+class CachedDecoderLayer(torch.nn.TransformerDecoderLayer):
+    """
+    Transformer decoder layer (post-norm, or pre-norm with norm_first), that can also run
+    incrementally on the newest position only. Adds no parameters, so its state dict
+    matches TransformerDecoderLayer.
+    """
+
+    @torch.jit.export
+    def project_memory(self, memory: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Projects the encoder memory to the keys and values of the cross-attention.
+
+        Args:
+            memory (Tensor): Encoder output, shape: [N, S, E].
+
+        Returns: Tuple: Keys and values, each of shape [N, H, S, E / H].
+        """
+
+        attn = self.multihead_attn
+        e = memory.size(-1)
+        k = F.linear(
+            memory, attn.in_proj_weight[e : 2 * e], attn.in_proj_bias[e : 2 * e]
+        )
+        v = F.linear(memory, attn.in_proj_weight[2 * e :], attn.in_proj_bias[2 * e :])
+        return _split_heads(k, attn.num_heads), _split_heads(v, attn.num_heads)
+
+    @torch.jit.export
+    def forward_cached(
+        self,
+        x: torch.Tensor,
+        self_k: Optional[torch.Tensor],
+        self_v: Optional[torch.Tensor],
+        memory_k: torch.Tensor,
+        memory_v: torch.Tensor,
+        memory_key_padding_mask: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Runs the layer on the newest position only.
+
+        Args:
+            x (Tensor): Input of the newest position, shape: [N, 1, E].
+            self_k (Tensor, optional): Cached self-attention keys of previous positions, shape: [N, H, T, E / H].
+            self_v (Tensor, optional): Cached self-attention values of previous positions, shape: [N, H, T, E / H].
+            memory_k (Tensor): Projected cross-attention keys, shape: [N, H, S, E / H].
+            memory_v (Tensor): Projected cross-attention values, shape: [N, H, S, E / H].
+            memory_key_padding_mask (Tensor): Padding mask of the encoder memory, shape: [N, S].
+
+        Returns: Tuple: Layer output of shape [N, 1, E], and the updated self-attention keys and values.
+        """
+
+        if self.norm_first:
+            out, k, v = self._sa_block_cached(self.norm1(x), self_k, self_v)
+            x = x + out
+            x = x + self._mha_block_cached(
+                self.norm2(x), memory_k, memory_v, memory_key_padding_mask
+            )
+            x = x + self._ff_block(self.norm3(x))
+        else:
+            out, k, v = self._sa_block_cached(x, self_k, self_v)
+            x = self.norm1(x + out)
+            x = self.norm2(
+                x
+                + self._mha_block_cached(x, memory_k, memory_v, memory_key_padding_mask)
+            )
+            x = self.norm3(x + self._ff_block(x))
+        return x, k, v
+
+    def _sa_block_cached(
+        self,
+        x: torch.Tensor,
+        self_k: Optional[torch.Tensor],
+        self_v: Optional[torch.Tensor],
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        # Self-attention of the newest position over the cached and newest keys and values
+        sa = self.self_attn
+        q, k, v = F.linear(x, sa.in_proj_weight, sa.in_proj_bias).chunk(3, dim=-1)
+        k, v = _split_heads(k, sa.num_heads), _split_heads(v, sa.num_heads)
+        if self_k is not None and self_v is not None:
+            k = torch.cat([self_k, k], dim=2)
+            v = torch.cat([self_v, v], dim=2)
+        out = _merge_heads(_attend(_split_heads(q, sa.num_heads), k, v))
+        return self.dropout1(sa.out_proj(out)), k, v
+
+    def _mha_block_cached(
+        self,
+        x: torch.Tensor,
+        memory_k: torch.Tensor,
+        memory_v: torch.Tensor,
+        memory_key_padding_mask: torch.Tensor,
+    ) -> torch.Tensor:
+        # Cross-attention of the newest position over the projected encoder memory
+        e = x.size(-1)
+        ca = self.multihead_attn
+        q = F.linear(x, ca.in_proj_weight[:e], ca.in_proj_bias[:e])
+        out = _attend(
+            _split_heads(q, ca.num_heads), memory_k, memory_v, memory_key_padding_mask
+        )
+        return self.dropout2(ca.out_proj(_merge_heads(out)))
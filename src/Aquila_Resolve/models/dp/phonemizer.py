@@ -1,17 +1,20 @@
 import re
 from itertools import zip_longest
-from typing import Dict, Union, List, Set
+from typing import TYPE_CHECKING, Dict, Union, List, Set
 
 from . import PhonemizerResult
-from .model.model import load_checkpoint
-from .model.predictor import Predictor
+
+if TYPE_CHECKING:
+    from .model.predictor import Predictor
 
 DEFAULT_PUNCTUATION = "().,:?!/–"
 
 
 class Phonemizer:
     def __init__(
-        self, predictor: Predictor, lang_phoneme_dict: Dict[str, Dict[str, str]] = None
+        self,
+        predictor: "Predictor",
+        lang_phoneme_dict: Dict[str, Dict[str, str]] = None,
     ) -> None:
         """
         Initializes a phonemizer with a ready predictor.
@@ -31,6 +34,7 @@ class Phonemizer:
         punctuation: str = DEFAULT_PUNCTUATION,
         expand_acronyms: bool = True,
         batch_size: int = 8,
+        token_budget: int = None,
     ) -> Union[str, List[str]]:
         """
         Phonemizes a single text or list of texts.
@@ -41,6 +45,7 @@ class Phonemizer:
           punctuation (str): Punctuation symbols by which the texts are split.
           expand_acronyms (bool): Whether to expand an acronym, e.g. DIY -> D-I-Y.
           batch_size (int): Batch size of model to speed up inference.
+          token_budget (int, optional): Max padded tokens of a model batch, used in place of batch_size.
 
         Returns:
           Union[str, List[str]]: Phonemized text as string, or list of strings, respectively.
@@ -53,6 +58,8 @@ class Phonemizer:
             lang=lang,
             punctuation=punctuation,
             expand_acronyms=expand_acronyms,
+            batch_size=batch_size,
+            token_budget=token_budget,
         )
 
         phoneme_lists = ["".join(phoneme_list) for phoneme_list in result.phonemes]
@@ -69,6 +76,7 @@ class Phonemizer:
         punctuation: str = DEFAULT_PUNCTUATION,
         expand_acronyms: bool = True,
         batch_size: int = 8,
+        token_budget: int = None,
     ) -> PhonemizerResult:
         """Phonemizes a list of texts and returns tokenized texts,
         phonemes and word predictions with probabilities.
@@ -79,6 +87,8 @@ class Phonemizer:
           punctuation (str): Punctuation symbols by which the texts are split. (Default value = DEFAULT_PUNCTUATION)
           expand_acronyms (bool): Whether to expand an acronym, e.g. DIY -> D-I-Y. (Default value = True)
           batch_size (int): Batch size of model to speed up inference. (Default value = 8)
+          token_budget (int, optional): Max padded tokens of a model batch (input length times decoding steps),
+            used in place of batch_size. (Default value = None)
 
         Returns:
           PhonemizerResult: Object containing original texts, phonemes, split texts, split phonemes, and predictions.
@@ -127,7 +137,10 @@ class Phonemizer:
         ]
 
         predictions = self.predictor(
-            words=words_to_predict, lang=lang, batch_size=batch_size
+            words=words_to_predict,
+            lang=lang,
+            batch_size=batch_size,
+            token_budget=token_budget,
         )
 
         word_phonemes.update({pred.word: pred.phonemes for pred in predictions})
@@ -203,6 +216,8 @@ class Phonemizer:
         checkpoint_path: str,
         device="cpu",
         lang_phoneme_dict: Dict[str, Dict[str, str]] = None,
+        precision: str = "fp32",
+        cache_path: str = None,
     ) -> "Phonemizer":
         """Initializes a Phonemizer object from a model checkpoint (.pt file).
 
@@ -210,20 +225,97 @@ class Phonemizer:
           checkpoint_path (str): Path to the .pt checkpoint file.
           device (str): Device to send the model to ('cpu' or 'cuda'). (Default value = 'cpu')
           lang_phoneme_dict (Dict[str, Dict[str, str]], optional): Word-phoneme dictionary for each language.
+          precision (str): Precision of the model weights, 'fp32' or 'int8' for dynamic quantization on cpu.
+            (Default value = 'fp32')
+          cache_path (str, optional): Path of the quantized checkpoint cache file, defaults to beside
+            the checkpoint file.
 
         Returns:
           Phonemizer: Phonemizer object carrying the loaded model and, optionally, a phoneme dictionary.
         """
 
-        model, checkpoint = load_checkpoint(checkpoint_path, device=device)
+        # Deferred import, torch is not needed by the NumPy backend
+        from .model.model import load_checkpoint
+        from .model.predictor import Predictor
+
+        model, checkpoint = load_checkpoint(
+            checkpoint_path, device=device, precision=precision, cache_path=cache_path
+        )
+        return cls._from_loaded(Predictor, model, checkpoint, lang_phoneme_dict)
+
+    @classmethod
+    def from_scripted(
+        cls,
+        scripted_path: str,
+        device="cpu",
+        lang_phoneme_dict: Dict[str, Dict[str, str]] = None,
+        checksum: str = None,
+    ) -> "Phonemizer":
+        """Initializes a Phonemizer object from a TorchScript model exported by save_scripted (.ts file).
+
+        Args:
+          scripted_path (str): Path to the .ts scripted model file.
+          device (str): Device to send the model to ('cpu' or 'cuda'). (Default value = 'cpu')
+          lang_phoneme_dict (Dict[str, Dict[str, str]], optional): Word-phoneme dictionary for each language.
+          checksum (str, optional): Checksum of the source checkpoint, raises ValueError
+            if the model was exported from a different checkpoint.
+
+        Returns:
+          Phonemizer: Phonemizer object carrying the loaded model and, optionally, a phoneme dictionary.
+        """
+
+        from .model.model import load_scripted
+        from .model.predictor import Predictor
+
+        model, checkpoint = load_scripted(
+            scripted_path, device=device, checksum=checksum
+        )
+        return cls._from_loaded(Predictor, model, checkpoint, lang_phoneme_dict)
+
+    @classmethod
+    def from_numpy(
+        cls,
+        checkpoint_path: str,
+        lang_phoneme_dict: Dict[str, Dict[str, str]] = None,
+        cache_path: str = None,
+    ) -> "Phonemizer":
+        """Initializes a Phonemizer object running inference with NumPy, without torch.
+
+        The checkpoint is converted to a NumPy weights file (.npz) on first use, which
+        is the only step that imports torch.
+
+        Args:
+          checkpoint_path (str): Path to the .pt checkpoint file.
+          lang_phoneme_dict (Dict[str, Dict[str, str]], optional): Word-phoneme dictionary for each language.
+          cache_path (str, optional): Path of the NumPy weights file, defaults to beside the checkpoint file.
+
+        Returns:
+          Phonemizer: Phonemizer object carrying the converted model and, optionally, a phoneme dictionary.
+        """
+
+        from .model.numpy_model import load_numpy, NumpyPredictor
+
+        model, checkpoint = load_numpy(checkpoint_path, cache_path=cache_path)
+        return cls._from_loaded(NumpyPredictor, model, checkpoint, lang_phoneme_dict)
+
+    @classmethod
+    def _from_loaded(
+        cls,
+        predictor_type: type,
+        model,
+        checkpoint: Dict,
+        lang_phoneme_dict: Dict[str, Dict[str, str]] = None,
+    ) -> "Phonemizer":
+        """Initializes a Phonemizer object from a loaded model and its checkpoint dictionary."""
+
         applied_phoneme_dict = None
         if lang_phoneme_dict is not None:
             applied_phoneme_dict = lang_phoneme_dict
         elif "phoneme_dict" in checkpoint:
             applied_phoneme_dict = checkpoint["phoneme_dict"]
         preprocessor = checkpoint["preprocessor"]
-        predictor = Predictor(model=model, preprocessor=preprocessor)
+        predictor = predictor_type(model=model, preprocessor=preprocessor)
         # logger = get_logger(__name__)
         # model_step = checkpoint['step']
         # logger.debug(f'Initializing phonemizer with model step {model_step}')
-        return Phonemizer(predictor=predictor, lang_phoneme_dict=applied_phoneme_dict)
+        return cls(predictor=predictor, lang_phoneme_dict=applied_phoneme_dict)
@@ -1,5 +1,7 @@
 from typing import List, Iterable, Dict, Tuple, Any
 
+import numpy as np
+
 
 class LanguageTokenizer:
 
@@ -119,6 +121,76 @@ class SequenceTokenizer:
             sequence = [self._get_start_index(language)] + sequence + [self.end_index]
         return sequence
 
+    def encode_batch(
+        self, sentences: List[str], language: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Maps a batch of sentences to padded token indices, same as calling the tokenizer on each.
+        Characters of all sentences are mapped in one vectorized pass through a lookup array
+        of code points.
+
+        Args:
+          sentences (List[str]): Sentences (or words) as strings of characters.
+          language (str): Language for the mapping that defines the start and end token indices.
+
+        Returns:
+          Tuple: Token indices padded with the pad index, shape: [N, T], and the sequence lengths, shape: [N].
+        """
+
+        if language not in self.languages:
+            raise ValueError(
+                f"Language not supported: {language}. Supported languages: {self.languages}"
+            )
+        n = len(sentences)
+        lookup = self._get_lookup()
+        try:
+            text = "".join(sentences).encode("utf-32-le")
+            codes = np.frombuffer(text, dtype=np.uint32)
+        except UnicodeEncodeError:  # Lone surrogates
+            codes = np.array([lookup.size], dtype=np.uint32)
+        if codes.size and codes.max() >= lookup.size:
+            # Rare characters outside the lookup array, lower-cased one at a time
+            sequences = [self(sentence, language) for sentence in sentences]
+            lengths = np.array([len(seq) for seq in sequences], dtype=np.int64)
+            tokens = np.zeros((n, lengths.max(initial=0)), dtype=np.int64)
+            for row, seq in zip(tokens, sequences):
+                row[: len(seq)] = seq
+            return tokens, lengths
+
+        ids = lookup[codes]
+        found = ids >= 0
+        # Tokens per sentence, from the running count of found characters at sentence bounds
+        bounds = np.zeros(n + 1, dtype=np.int64)
+        bounds[1:] = np.cumsum([len(sentence) for sentence in sentences])
+        found_count = np.zeros(codes.size + 1, dtype=np.int64)
+        np.cumsum(found, out=found_count[1:])
+        counts = np.diff(found_count[bounds]) * self.char_repeats
+        ids = np.repeat(ids[found], self.char_repeats)
+
+        offset = 1 if self.append_start_end else 0
+        lengths = counts + 2 * offset
+        tokens = np.zeros((n, lengths.max(initial=0)), dtype=np.int64)
+        rows = np.repeat(np.arange(n), counts)
+        cols = np.arange(ids.size) - np.repeat(np.cumsum(counts) - counts, counts)
+        tokens[rows, cols + offset] = ids
+        if self.append_start_end and n > 0:
+            tokens[:, 0] = self._get_start_index(language)
+            tokens[np.arange(n), lengths - 1] = self.end_index
+        return tokens, lengths
+
+    def _get_lookup(self) -> np.ndarray:
+        """Token index of each code point, -1 for characters without a token"""
+        # Built on first use, as tokenizers unpickled from checkpoints skip __init__
+        lookup = getattr(self, "_lookup", None)
+        if lookup is None:
+            size = max([128] + [ord(t) + 1 for t in self.token_to_idx if len(t) == 1])
+            lookup = np.full(size, -1, dtype=np.int64)
+            for code in range(size):
+                char = chr(code).lower() if self.lowercase else chr(code)
+                lookup[code] = self.token_to_idx.get(char, -1)
+            self._lookup = lookup
+        return lookup
+
     def decode(
         self, sequence: Iterable[int], remove_special_tokens: bool = False
     ) -> List[str]:
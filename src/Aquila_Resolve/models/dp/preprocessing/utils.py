@@ -18,3 +18,30 @@ def u_batchify(input: List[Any], batch_size: int) -> List[List[Any]]:
         batch = input[i : min(i + batch_size, l)]
         output.append(batch)
     return output
+
+
+def u_decode_cost(
+    input_len: int, ratio: float, offset: int, max_len: int = 100, char_repeats: int = 1
+) -> int:
+    # Padded tokens of a row: input length times its decoding step budget,
+    # which is of the length without repeats (the start and end tokens are not repeated)
+    steps_len = (input_len + 2 * (char_repeats - 1)) // char_repeats
+    return input_len * min(math.ceil(steps_len * ratio) + offset, max_len)
+
+
+def u_batchify_budget(
+    input: List[Any], costs: List[int], budget: int
+) -> List[List[Any]]:
+    # Padded cost of a batch is its size times its largest row cost,
+    # rows over the budget get a batch of their own
+    output = []
+    batch, max_cost = [], 0
+    for item, cost in zip(input, costs):
+        max_cost = max(max_cost, cost)
+        if batch and (len(batch) + 1) * max_cost > budget:
+            output.append(batch)
+            batch, max_cost = [], cost
+        batch.append(item)
+    if batch:
+        output.append(batch)
+    return output
@@ -189,8 +189,9 @@ class Processor:
             return None  # No plural found
         # Now check if the word is a plural using pos
         if pos is None:
-            pos = self._tag(word)
-        if pos is None or len(pos) == 0 or (pos[0] != "NNS" and pos[0] != "NNPS"):
+            tags = self._tag(word)
+            pos = tags[0] if tags else None
+        if pos != "NNS" and pos != "NNPS":
             return None  # No tag found
         # If initial check passes, register a hit
         self.stat_hits["plural"] += 1
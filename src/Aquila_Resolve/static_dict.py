@@ -1,14 +1,281 @@
 # Compressed Dictionary IO tools
+from __future__ import annotations
 import gzip
 import json
-from .data import DATA_PATH
+import os
+import struct
+import warnings
+import zlib
+from array import array
+from mmap import mmap as _mmap, ACCESS_READ
+from collections.abc import Mapping
+from .data import DATA_PATH, get_cache_file
+from .symbols import phonemes
 
+# Binary dictionary layout, all sections 4-byte aligned, native byte order:
+#   header, phoneme symbols (newline separated), key offsets (uint32[n + 1]),
+#   sorted utf-8 key blob, value offsets (uint32[n + 1]), phoneme ids (uint8),
+#   open addressing hash index of keys by crc32 (int32[table size], -1 for empty slots)
+_MAGIC = b"AQCD"
+_VERSION = 2
+_BOM = 0x01020304  # Detects a file built on a machine with a different byte order
+_HEADER = struct.Struct("=4sIIIIIII")
 
-def get_cmudict(filename=None) -> dict:
+
+def get_cmudict(
+    filename=None, mmap: bool = False, compact: bool = False
+) -> dict | MappedDict:
     """
     Reads a compressed dictionary from a file.
+
+    :param filename: Path of the compressed json dictionary
+    :param mmap: Return a memory-mapped view of the compiled binary dictionary, which
+        is compiled in the user cache directory if missing or outdated
+    :param compact: Return a CompactDict of the compiled binary dictionary, read into
+        memory. Ignored if mmap is True
+    :return: Dict of {word: phonemes}. If the binary dictionary can not be compiled,
+        the json dictionary is returned with a warning.
     """
     if not filename:
         filename = DATA_PATH.joinpath("cmudict.json.gz")
+    if mmap or compact:
+        src_mtime = os.stat(filename).st_mtime_ns  # Missing source raises
+        bin_file = compiled_path(filename)
+        try:
+            if not _is_current(bin_file, src_mtime):
+                compile_cmudict(filename, bin_file)
+        except OSError as e:  # Read-only or missing cache directory
+            warnings.warn(
+                f"Could not compile the binary dictionary, using the json dictionary: {e}"
+            )
+        else:
+            return MappedDict(bin_file) if mmap else CompactDict(bin_file)
     with gzip.open(filename, "rt") as f:
         return json.load(f)
+
+
+def compiled_path(filename) -> str:
+    """
+    Path of the binary dictionary compiled from a json dictionary, in the user cache directory.
+    Named by the json file and a hash of its absolute path, so each source has its own file.
+    """
+    return get_cache_file(filename, ".bin")
+
+
+def _is_current(bin_file, src_mtime: int) -> bool:
+    """Checks if the compiled dictionary is of this version and newer than its source"""
+    try:
+        with open(bin_file, "rb") as f:
+            header = f.read(_HEADER.size)
+        bin_mtime = os.stat(bin_file).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    if len(header) < _HEADER.size:
+        return False
+    magic, version, bom = _HEADER.unpack(header)[:3]
+    if magic != _MAGIC or version != _VERSION or bom != _BOM:
+        return False
+    return bin_mtime >= src_mtime
+
+
+def _pad(buf: bytearray) -> None:
+    buf.extend(b"\0" * (-len(buf) % 4))
+
+
+def compile_cmudict(filename=None, output=None) -> str:
+    """
+    Compiles a compressed json dictionary into the binary format read by MappedDict.
+
+    :param filename: Path of the compressed json dictionary
+    :param output: Path of the binary dictionary, defaults to compiled_path of the json path
+    :return: Path of the binary dictionary
+    """
+    if not filename:
+        filename = DATA_PATH.joinpath("cmudict.json.gz")
+    if not output:
+        output = compiled_path(filename)
+    with gzip.open(filename, "rt") as f:
+        data = json.load(f)
+
+    keys = sorted(k.encode("utf-8") for k in data)
+    symbols = sorted({p for v in data.values() for p in v.split(" ")})
+    if len(symbols) > 256:
+        raise ValueError(
+            f"Too many phoneme symbols for the binary format: {len(symbols)}"
+        )
+    symbol_ids = {s: i for i, s in enumerate(symbols)}
+
+    key_offsets = array("I", [0])
+    value_offsets = array("I", [0])
+    values = bytearray()
+    for key in keys:
+        key_offsets.append(key_offsets[-1] + len(key))
+        values.extend(symbol_ids[p] for p in data[key.decode("utf-8")].split(" "))
+        value_offsets.append(len(values))
+
+    # Open addressing hash index of keys, at most half full
+    size = 1 << (2 * len(keys)).bit_length()
+    mask = size - 1
+    index = array("i", [-1]) * size
+    for i, key in enumerate(keys):
+        h = zlib.crc32(key) & mask
+        while index[h] >= 0:
+            h = (h + 1) & mask
+        index[h] = i
+
+    body = bytearray()
+    body.extend("\n".join(symbols).encode("utf-8"))
+    symbols_len = len(body)
+    _pad(body)
+    body.extend(key_offsets.tobytes())
+    body.extend(b"".join(keys))
+    _pad(body)
+    body.extend(value_offsets.tobytes())
+    body.extend(values)
+    _pad(body)
+    body.extend(index.tobytes())
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        _BOM,
+        len(keys),
+        symbols_len,
+        key_offsets[-1],
+        len(values),
+        size,
+    )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    # Written to a temporary file then renamed, so concurrent readers never see a partial file
+    tmp = f"{output}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp, output)
+    return output
+
+
+class MappedDict(Mapping):
+    def __init__(self, filename):
+        """
+        Read-only dict view of a binary dictionary compiled by compile_cmudict.
+        The file is memory-mapped, so its pages are shared between processes.
+        Keys are found with the hash index of the file, at a few microseconds per lookup,
+        about ten times a dict lookup.
+
+        :param filename: Path of the binary dictionary
+        """
+        with open(filename, "rb") as f:
+            self._mm = _mmap(f.fileno(), 0, access=ACCESS_READ)
+        try:
+            self._load(self._mm, filename)
+        except ValueError:
+            self._mm.close()
+            raise
+
+    def _load(self, buf, filename) -> None:
+        """Reads the sections of a binary dictionary in a buffer"""
+        (
+            magic,
+            version,
+            bom,
+            n,
+            symbols_len,
+            keys_len,
+            values_len,
+            table_size,
+        ) = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION or bom != _BOM:
+            raise ValueError(f"Not a compatible binary dictionary: {filename}")
+        self._buf = buf
+        pos = _HEADER.size
+        self._symbols = bytes(buf[pos : pos + symbols_len]).decode("utf-8").split("\n")
+        pos += symbols_len + (-symbols_len % 4)
+        view = memoryview(buf)
+        self._key_offsets = view[pos : pos + 4 * (n + 1)].cast("I")
+        pos += 4 * (n + 1)
+        self._keys = pos
+        pos += keys_len + (-keys_len % 4)
+        self._value_offsets = view[pos : pos + 4 * (n + 1)].cast("I")
+        pos += 4 * (n + 1)
+        self._values = pos
+        self._values_len = values_len
+        pos += values_len + (-values_len % 4)
+        self._table = view[pos : pos + 4 * table_size].cast("i")
+        self._mask = table_size - 1
+        self._len = n
+
+    def _key(self, i: int) -> bytes:
+        offsets = self._key_offsets
+        return self._buf[self._keys + offsets[i] : self._keys + offsets[i + 1]]
+
+    def _index(self, key) -> int:
+        """Hash index lookup of a key, -1 if not found"""
+        if not isinstance(key, str):
+            return -1
+        target = key.encode("utf-8")
+        table, mask = self._table, self._mask
+        buf, keys, offsets = self._buf, self._keys, self._key_offsets
+        h = zlib.crc32(target) & mask
+        while True:
+            i = table[h]
+            if i < 0 or buf[keys + offsets[i] : keys + offsets[i + 1]] == target:
+                return i
+            h = (h + 1) & mask
+
+    def __getitem__(self, key) -> str:
+        i = self._index(key)
+        if i < 0:
+            raise KeyError(key)
+        start = self._values + self._value_offsets[i]
+        end = self._values + self._value_offsets[i + 1]
+        return " ".join(map(self._symbols.__getitem__, self._buf[start:end]))
+
+    def __contains__(self, key) -> bool:
+        return self._index(key) >= 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._key(i).decode("utf-8")
+
+    def close(self) -> None:
+        """Releases the memory map"""
+        self._key_offsets.release()
+        self._value_offsets.release()
+        self._table.release()
+        self._mm.close()
+
+
+class CompactDict(MappedDict):
+    def __init__(self, filename):
+        """
+        Read-only dict of a binary dictionary compiled by compile_cmudict, held in memory.
+
+        Pronunciations are kept as bytes of indices into symbols.phonemes, and only
+        decoded to strings on access. With no Python objects per entry, this takes a
+        fraction of the memory of the json dictionary. Keys are found with the hash index
+        of the file.
+
+        :param filename: Path of the binary dictionary
+        """
+        with open(filename, "rb") as f:
+            buf = f.read()
+        self._load(buf, filename)
+        # Re-index phonemes to symbols.phonemes, other symbols (like empty) follow them
+        file_symbols = self._symbols
+        symbols = phonemes + [s for s in file_symbols if s not in phonemes]
+        ids = {s: i for i, s in enumerate(symbols)}
+        table = bytes(ids[s] for s in file_symbols).ljust(256, b"\0")
+        start, end = self._values, self._values + self._values_len
+        self._load(buf[:start] + buf[start:end].translate(table) + buf[end:], filename)
+        self._symbols = symbols
+        # Sections are copied to arrays, which are faster to index than memoryviews
+        self._key_offsets = array("I", self._key_offsets)
+        self._value_offsets = array("I", self._value_offsets)
+        self._table = array("i", self._table)
+
+    def close(self) -> None:
+        """Nothing to release, the dictionary is held in memory"""
@@ -41,6 +41,8 @@ WRB	    wh-abverb	where, when
 """
 
 from __future__ import annotations
+import re
+from bisect import bisect_right
 
 # noinspection SpellCheckingInspection,GrazieInspection
 graphemes = list("abcdefghijklmnopqrstuvwxyz")
@@ -161,6 +163,7 @@ phonemes_set = set(phonemes)
 pos_tags_set = set(pos_tags)
 pos_type_tags_set = set(pos_type_tags)
 pos_type_short_tags_set = set(pos_type_short_tags)
+re_braces = re.compile(r"[{}]")
 punctuation = {
     ".",
     ",",
@@ -275,7 +278,8 @@ def valid_braces(text: str, raise_on_invalid: bool = False) -> bool:
     if not any(c in text for c in {"{", "}"}):
         return True  # No braces, so valid.
     in_braces = False
-    for char in text:
+    for match in re_braces.finditer(text):
+        char = match.group()
         if char == "{":
             if not in_braces:
                 in_braces = True
@@ -289,3 +293,46 @@ def valid_braces(text: str, raise_on_invalid: bool = False) -> bool:
     if in_braces:
         return invalid("Opening brace without closing")
     return True
+
+
+class BraceIndex:
+    def __init__(self, text: str):
+        """
+        Index of the regions of a text within braces (including the braces).
+        Checking a position is a binary search, instead of a regex lookaround
+        that rescans the text.
+
+        Unmatched braces are literal text and not indexed, like the
+        braces of an unclosed region.
+
+        :param text: Text to index
+        """
+        self.starts = []
+        self.ends = []
+        start = None
+        for match in re_braces.finditer(text):
+            if match.group() == "{":
+                if start is None:
+                    start = match.start()
+            elif start is not None:
+                self.starts.append(start)
+                self.ends.append(match.end())
+                start = None
+
+    def region(self, pos: int) -> tuple[int, int] | None:
+        """
+        Region containing a position.
+
+        :param pos: Position in the text
+        :return: Tuple of (start, end) indices of the region, or None if the position is not within braces
+        """
+        i = bisect_right(self.starts, pos) - 1
+        if i >= 0 and pos < self.ends[i]:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def __contains__(self, pos: int) -> bool:
+        return self.region(pos) is not None
+
+    def __len__(self) -> int:
+        return len(self.starts)
@@ -4,8 +4,9 @@ This module provides parsing of numeric types in English to text.
 Modified from https://github.com/keithito/tacotron
 """
 
-import inflect
 import re
+from functools import lru_cache
+from ..symbols import BraceIndex
 
 _magnitudes = ["trillion", "billion", "million", "thousand", "hundred", "m", "b", "t"]
 _magnitudes_key = {"m": "million", "b": "billion", "t": "trillion"}
@@ -19,34 +20,62 @@ _measurements_key = {
     "ft": "feet",
 }
 _currency_key = {"$": "dollar", "£": "pound", "€": "euro", "₩": "won"}
-_inflect = inflect.engine()
 _comma_number_re = re.compile(r"([0-9][0-9,]+[0-9])")
-_decimal_number_re = re.compile(r"([0-9]+\.[0-9]+)")
+# Patterns starting with a run of digits only match from the start of the run,
+# and avoid nested repeats ([0-9.,]*[0-9] instead of [0-9.,]*[0-9]+),
+# so that scanning a long run is linear
+_decimal_number_re = re.compile(r"(?<![0-9])([0-9]+\.[0-9]+)")
 _currency_re = re.compile(
-    r"([$€£₩])([0-9.,]*[0-9]+)(?:[ ]?({})(?=[^a-zA-Z]|$))?".format(
+    r"([$€£₩])([0-9.,]*[0-9])(?:[ ]?({})(?=[^a-zA-Z]|$))?".format(
         "|".join(_magnitudes)
     ),
     re.IGNORECASE,
 )
 # _measurement_re = re.compile(r'([0-9.,]*[0-9]+(\s)?{}\b)'.format(_measurements), re.IGNORECASE)
+# Matches within braces are skipped using a BraceIndex
 _measurement_re = re.compile(
-    r"(?<!\{)" + r"([\d.,]*\d+(\s)?{}\b)".format(_measurements) + r"(?![\w\s]*[}])",
-    re.IGNORECASE,
+    r"(?<![\d.,])([\d.,]*\d(\s)?{}\b)".format(_measurements), re.IGNORECASE
 )
-_ordinal_re = re.compile(r"[0-9]+(st|nd|rd|th)")
+_ordinal_re = re.compile(r"(?<![0-9])[0-9]+(st|nd|rd|th)")
 _range_re = re.compile(r"(?<=[0-9])+(-)(?=[0-9])+.*?")
 _roman_re = re.compile(
     r"\b(?=[MDCLXVI]+\b)M{0,4}(CM|CD|D?C{0,3})(XC|XL|L?X{0,3})(IX|IV|V?I{2,3})\b"
 )  # avoid I
+# Longer numbers than inflect supports (decillions) are read digit by digit
+_long_number_re = re.compile(r"[0-9]{37,}")
+_digit_words = ["zero", "one", "two", "three", "four"]
+_digit_words += ["five", "six", "seven", "eight", "nine"]
 _multiply_re = re.compile(r"(\b[0-9]+)(x)([0-9]+)")
 # _number_re = re.compile(r"[0-9]+'s|[0-9]+s|[0-9]+")
-_number_re = re.compile(r"[0-9]+'s|[0-9]+s|(?<!\{)[0-9]+(?![\w\s]*[}])")
+_number_re = re.compile(r"(?<![0-9])(?:[0-9]+'s|[0-9]+s|[0-9]+)")
+# Whitespace delimited chunks that any of the above patterns can match in
+_numeric_chunk_re = re.compile(
+    r"(?<!\S)\S*?(?:[0-9$€£₩]|" + _roman_re.pattern + r")\S*"
+)
+_chunk_re = re.compile(r"\s*\S+")
+
+
+@lru_cache(maxsize=None)
+def _get_inflect():
+    # inflect is slow to import, so it is only loaded when first needed
+    import inflect
+
+    return inflect.engine()
+
+
+@lru_cache(maxsize=10000)
+def _number_to_words(num, **kwargs) -> str:
+    return _get_inflect().number_to_words(num, **kwargs)
 
 
 def _remove_commas(m):
     return m.group(1).replace(",", "")
 
 
+def _expand_digits(m):
+    return " ".join(_digit_words[int(c)] for c in m.group(0))
+
+
 def _expand_decimal_point(m):
     return m.group(1).replace(".", " point ")
 
@@ -78,7 +107,7 @@ def _expand_currency(m):
         return "{} {}, {} {}".format(
             _expand_hundreds(dollars),
             dollar_unit,
-            _inflect.number_to_words(cents),
+            _number_to_words(cents),
             cent_unit,
         )
     elif dollars:
@@ -86,7 +115,7 @@ def _expand_currency(m):
         return "{} {}".format(_expand_hundreds(dollars), dollar_unit)
     elif cents:
         cent_unit = "cent" if cents == 1 else "cents"
-        return "{} {}".format(_inflect.number_to_words(cents), cent_unit)
+        return "{} {}".format(_number_to_words(cents), cent_unit)
     else:
         return "zero" + " " + currency + "s"
 
@@ -94,18 +123,18 @@ def _expand_currency(m):
 def _expand_hundreds(text):
     number = float(text)
     if 1000 < number < 10000 and (number % 100 == 0) and (number % 1000 != 0):
-        return _inflect.number_to_words(int(number / 100)) + " hundred"
+        return _number_to_words(int(number / 100)) + " hundred"
     else:
-        return _inflect.number_to_words(text)
+        return _number_to_words(text)
 
 
 def _expand_ordinal(m):
-    return _inflect.number_to_words(m.group(0))
+    return _number_to_words(m.group(0))
 
 
 def _expand_measurement(m):
     _, number, measurement = re.split(r"(\d+(?:\.\d+)?)", m.group(0))
-    number = _inflect.number_to_words(number)
+    number = _number_to_words(number)
     measurement = "".join(measurement.split())
     measurement = _measurements_key.get(measurement.lower(), measurement)
     # if measurement is plural, and number is singular, remove the 's'
@@ -142,22 +171,22 @@ def _expand_number(m):
     _, number, suffix = re.split(r"(\d+(?:'?\d+)?)", m.group(0))
     number = int(number)
     if 1000 < number < 10000 and (number % 100 == 0) and (number % 1000 != 0):
-        text = _inflect.number_to_words(number // 100) + " hundred"
+        text = _number_to_words(number // 100) + " hundred"
     elif 1000 < number < 3000:
         if number == 2000:
             text = "two thousand"
         elif 2000 < number < 2010:
-            text = "two thousand " + _inflect.number_to_words(number % 100)
+            text = "two thousand " + _number_to_words(number % 100)
         elif number % 100 == 0:
-            text = _inflect.number_to_words(number // 100) + " hundred"
+            text = _number_to_words(number // 100) + " hundred"
         else:
-            number = _inflect.number_to_words(
-                number, andword="", zero="oh", group=2
-            ).replace(", ", " ")
+            number = _number_to_words(number, andword="", zero="oh", group=2).replace(
+                ", ", " "
+            )
             number = re.sub(r"-", " ", number)
             text = number
     else:
-        number = _inflect.number_to_words(number, andword="and")
+        number = _number_to_words(number, andword="and")
         number = re.sub(r"-", " ", number)
         number = re.sub(r",", "", number)
         text = number
@@ -171,14 +200,68 @@ def _expand_number(m):
     return text
 
 
-def normalize_numbers(text: str) -> str:
+def _numeric_spans(text: str):
+    """
+    Scans text for the spans that number normalization can change.
+
+    Each span is a chunk containing a digit, currency symbol or roman numeral,
+    extended by the chunk that follows it (for magnitudes and units).
+
+    :param text: Text to be scanned
+    :return: Generator of (start, end) tuples, in order
+    """
+    start = end = None
+    for match in _numeric_chunk_re.finditer(text):
+        if end is not None and match.start() > end:
+            yield start, end
+            start = None
+        if start is None:
+            start = match.start()
+        follower = _chunk_re.match(text, match.end())
+        end = max(end or 0, follower.end() if follower else match.end())
+    if start is not None:
+        yield start, end
+
+
+def _sub_unbraced(pattern: re.Pattern, repl, text: str) -> str:
+    """re.sub, leaving matches within braces unchanged"""
+    if "{" not in text and "}" not in text:
+        return pattern.sub(repl, text)
+    braces = BraceIndex(text)
+    return pattern.sub(lambda m: m.group(0) if m.start() in braces else repl(m), text)
+
+
+def _normalize_span(text: str) -> str:
     text = re.sub(_comma_number_re, _remove_commas, text)
+    text = re.sub(_long_number_re, _expand_digits, text)
     text = re.sub(_currency_re, _expand_currency, text)
     text = re.sub(_decimal_number_re, _expand_decimal_point, text)
     text = re.sub(_ordinal_re, _expand_ordinal, text)
     # text = re.sub(_range_re, _expand_range, text)
-    text = re.sub(_measurement_re, _expand_measurement, text)
+    text = _sub_unbraced(_measurement_re, _expand_measurement, text)
     text = re.sub(_roman_re, _expand_roman, text)
     text = re.sub(_multiply_re, _expand_multiply, text)
-    text = re.sub(_number_re, _expand_number, text)
+    text = _sub_unbraced(_number_re, _expand_number, text)
     return text
+
+
+def normalize_numbers(text: str) -> str:
+    braces = BraceIndex(text)
+    result = []
+    pos = 0
+    for start, end in _numeric_spans(text):
+        # Spans within braces that open before or close after the span are
+        # given the missing brace, so that the span is indexed the same way
+        head = tail = ""
+        region = braces.region(start)
+        if region is not None and region[0] < start:
+            head = "{"
+        region = braces.region(end - 1)
+        if region is not None and region[1] > end:
+            tail = "}"
+        span = _normalize_span(head + text[start:end] + tail)
+        result.append(text[pos:start])
+        result.append(span[len(head) : len(span) - len(tail)])
+        pos = end
+    result.append(text[pos:])
+    return "".join(result)
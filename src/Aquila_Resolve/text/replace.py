@@ -1,4 +1,9 @@
+from __future__ import annotations
 import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable
+from ..symbols import BraceIndex
 
 
 def replace_first(target: str, replacement: str, text: str) -> str:
@@ -16,10 +21,81 @@ def replace_first(target: str, replacement: str, text: str) -> str:
         return text  # Return original if no target or text
     # Replace the first instance of a word with its phonemes
     # return re.sub(r'(?i)\b' + target + r'\b', replacement, text, 1)
-    return re.sub(
-        r"(?<!\{)\b" + target + r"\b(?![\w\s]*[}])",
-        replacement,
-        text,
-        count=1,
-        flags=re.IGNORECASE,
-    )
+    braces = BraceIndex(text)
+    for match in re.finditer(r"\b" + re.escape(target) + r"\b", text, re.IGNORECASE):
+        if match.start() not in braces:
+            return text[: match.start()] + replacement + text[match.end() :]
+    return text
+
+
+_re_word = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=4096)
+def _word_pattern(word: str) -> re.Pattern:
+    # Whole word, case-insensitive
+    return re.compile(r"(?<!\w)" + re.escape(word) + r"(?!\w)", re.IGNORECASE)
+
+
+def replace_words(pairs: Iterable[tuple[str, str]], text: str) -> str:
+    """
+    Replaces a sequence of words, building the result in a single pass.
+
+    Equivalent to calling replace_first for each pair in order, but the text
+    is indexed once by word, so the cost is linear in the length of the text.
+    Words within braces are ignored, and words that are not found are skipped.
+
+    :param pairs: Iterable of (target, replacement) tuples
+    :param text: Text to be searched
+    :return: Text with the words replaced
+    """
+    # Start positions of each word in the text, by lowercase word
+    index = {}
+    for match in _re_word.finditer(text):
+        index.setdefault(match.group().lower(), []).append(match.start())
+    braces = BraceIndex(text)
+    # Replaced spans, sorted by start
+    starts, ends, replacements = [], [], []
+    # Position in the index of the next candidate for each target
+    next_candidate = {}
+
+    for target, replacement in pairs:
+        if not target:
+            continue
+        pattern = _word_pattern(target)
+        lead = _re_word.match(target)
+        if lead is not None:
+            candidates = index.get(lead.group().lower(), ())
+        else:
+            # Targets starting with punctuation are not indexed, search the text
+            candidates = [match.start() for match in pattern.finditer(text)]
+        i = next_candidate.get(target, 0)
+        while i < len(candidates):
+            start = candidates[i]
+            i += 1
+            match = pattern.match(text, start)
+            if match is None:
+                continue
+            end = match.end()
+            # Skip matches within braces
+            if start in braces:
+                continue
+            # Skip matches overlapping an earlier replacement
+            j = bisect_right(starts, start)
+            if (j > 0 and ends[j - 1] > start) or (j < len(starts) and starts[j] < end):
+                continue
+            starts.insert(j, start)
+            ends.insert(j, end)
+            replacements.insert(j, replacement)
+            break
+        if lead is not None:
+            next_candidate[target] = i
+
+    result = []
+    pos = 0
+    for start, end, replacement in zip(starts, ends, replacements):
+        result.append(text[pos:start])
+        result.append(replacement)
+        pos = end
+    result.append(text[pos:])
+    return "".join(result)
@@ -1,4 +1,6 @@
 # Fixtures for dictionary setup
+import os
+
 import pytest
 import unittest.mock as mock
 from Aquila_Resolve import dictionary
@@ -40,6 +42,15 @@ def pytest_sessionstart(session):
     assert download() is True
 
 
+@pytest.fixture(scope="session", autouse=True)
+# Files compiled or tuned at runtime go to a temporary cache directory, not the user's
+def cache_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cache")
+    os.environ["AQUILA_RESOLVE_CACHE"] = str(path)
+    yield path
+    del os.environ["AQUILA_RESOLVE_CACHE"]
+
+
 # noinspection PyUnusedLocal
 def always_exists(path):
     return True
@@ -0,0 +1,375 @@
+import math
+import os
+
+import pytest
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from Aquila_Resolve import symbols
+from Aquila_Resolve.static_dict import get_cmudict
+from Aquila_Resolve.models.dp.model import utils
+from Aquila_Resolve.models.dp.model import model as model_module
+from Aquila_Resolve.models.dp.model import numpy_model
+from Aquila_Resolve.models.dp.model.predictor import Predictor
+from Aquila_Resolve.models.dp.model.model import AutoregressiveTransformer
+from Aquila_Resolve.models.dp.preprocessing.text import Preprocessor, SequenceTokenizer
+from Aquila_Resolve.models.dp.preprocessing.utils import (
+    u_batchify_budget,
+    u_decode_cost,
+)
+
+config = {
+    "preprocessing": {
+        "text_symbols": list("abcdefghijklmnopqrstuvwxyz'-"),
+        "phoneme_symbols": ["[" + ph + "]" for ph in symbols.phonemes],
+        "languages": ["en_us"],
+        "char_repeats": 1,
+        "lowercase": True,
+    },
+    "model": {
+        "type": "autoreg_transformer",
+        "d_model": 32,
+        "d_fft": 64,
+        "layers": 2,
+        "dropout": 0.1,
+        "heads": 2,
+    },
+}
+
+# noinspection SpellCheckingInspection
+words = ["a", "cat", "kalpe", "hevinet", "ioniformi", "tensorflow", "agglomerative"]
+
+
+@pytest.fixture(scope="module")
+def preprocessor():
+    yield Preprocessor.from_config(config)
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    model = AutoregressiveTransformer.from_config(config)
+    # Raise the end token logit so random rows finish at varying lengths
+    with torch.no_grad():
+        model.fc_out.bias[model.end_index] += 1.0
+    model.eval()
+    yield model
+
+
+@pytest.fixture(scope="module")
+def batch(preprocessor):
+    inputs = [torch.tensor(preprocessor.text_tokenizer(w, "en_us")) for w in words]
+    start_index = preprocessor.phoneme_tokenizer._get_start_index("en_us")
+    yield {
+        "text": pad_sequence(inputs, batch_first=True, padding_value=0),
+        "text_len": torch.tensor([len(i) for i in inputs]),
+        "start_index": torch.tensor([start_index] * len(inputs)),
+    }
+
+
+def test_generate_cached(model, batch):
+    out, probs = model.generate(batch, use_cache=False)
+    out_cached, probs_cached = model.generate(batch, use_cache=True)
+    assert torch.equal(out, out_cached)
+    assert torch.allclose(probs, probs_cached, atol=1e-5)
+
+
+def test_generate_max_steps(model, batch):
+    out, probs = model.generate(batch)
+    max_steps = utils._get_max_steps(batch["text"], 100)
+    assert out.size(1) <= int(max_steps.max()) + 1
+    lens = utils._get_lens_util_stop(out, model.end_index)
+    assert torch.all(lens <= max_steps + 1)
+    assert out.size() == probs.size()
+
+
+@pytest.mark.parametrize("char_repeats", [1, 2])
+def test_max_steps_cmudict(char_repeats):
+    # The step budget must cover the phonemes of every cmudict entry
+    cmudict = get_cmudict()
+    # Tokenized lengths, with each character repeated and start and end tokens
+    text_len = torch.tensor([len(w.split("(")[0]) * char_repeats + 2 for w in cmudict])
+    steps = torch.tensor([len(p.split(" ")) + 1 for p in cmudict.values()])
+    inp = (torch.arange(int(text_len.max())) < text_len.unsqueeze(1)).to(torch.uint8)
+    budget = utils._get_max_steps(inp, 1000, char_repeats)
+    assert torch.all(steps <= budget)
+    # Same budget as without repeats
+    unrepeated = (text_len - 2) // char_repeats + 2
+    expected = torch.ceil(unrepeated * utils.MAX_STEPS_RATIO) + utils.MAX_STEPS_OFFSET
+    assert torch.equal(budget, expected.long())
+    # Batching cost of a row is its length times the budget
+    assert u_decode_cost(
+        int(text_len[0]),
+        utils.MAX_STEPS_RATIO,
+        utils.MAX_STEPS_OFFSET,
+        max_len=1000,
+        char_repeats=char_repeats,
+    ) == int(text_len[0] * budget[0])
+
+
+def test_max_steps_char_repeats():
+    repeated = dict(config, preprocessing=dict(config["preprocessing"], char_repeats=2))
+    model = AutoregressiveTransformer.from_config(repeated)
+    assert model.char_repeats == 2
+    preprocessor = Preprocessor.from_config(repeated)
+    text = torch.tensor([preprocessor.text_tokenizer("tensorflow", "en_us")])
+    assert torch.equal(
+        utils._get_max_steps(text, 100, model.char_repeats),
+        utils._get_max_steps(torch.ones(1, len("tensorflow") + 2), 100),
+    )
+
+
+@pytest.mark.parametrize("size", [1, 5, 128, 300])
+def test_tgt_mask(model, size):
+    expected = utils._generate_square_subsequent_mask(size)
+    assert torch.equal(model._get_tgt_mask(size), expected)
+    # The shared buffer is not reassigned
+    assert model.tgt_mask.size(0) == 128
+
+
+@pytest.mark.parametrize("norm_first", [False, True])
+def test_cached_decoder_layer(norm_first):
+    torch.manual_seed(0)
+    layer = utils.CachedDecoderLayer(
+        d_model=32, nhead=2, dim_feedforward=64, norm_first=norm_first
+    ).eval()
+    tgt, memory = torch.randn(6, 3, 32), torch.randn(4, 3, 32)
+    pad_mask = torch.zeros(3, 4, dtype=torch.bool)
+    pad_mask[0, -1] = True
+    expected = layer(
+        tgt,
+        memory,
+        tgt_mask=utils._generate_square_subsequent_mask(6),
+        memory_key_padding_mask=pad_mask,
+    ).transpose(0, 1)
+    memory_k, memory_v = layer.project_memory(memory.transpose(0, 1))
+    self_k, self_v = None, None
+    for i in range(6):
+        out, self_k, self_v = layer.forward_cached(
+            tgt[i].unsqueeze(1), self_k, self_v, memory_k, memory_v, pad_mask
+        )
+        assert torch.allclose(out[:, 0], expected[:, i], atol=1e-5)
+
+
+def test_quantize_model(model, batch):
+    quantized = model_module.quantize_model(model)
+    linear_types = {
+        type(m) for m in quantized.modules() if "Linear" in type(m).__name__
+    }
+    assert torch.nn.Linear not in linear_types  # All plain Linear layers are replaced
+    out, probs = model.generate(batch)
+    out_q, probs_q = quantized.generate(batch)
+    assert out_q.size(0) == out.size(0)
+    # Greedy decoding mostly agrees, small logit differences can flip close tokens
+    steps = min(out.size(1), out_q.size(1))
+    assert (out[:, :steps] == out_q[:, :steps]).float().mean() > 0.8
+
+
+@pytest.fixture
+def checkpoint_file(tmp_path, model, preprocessor):
+    path = tmp_path / "model.pt"
+    torch.save(
+        {
+            "config": config,
+            "preprocessor": preprocessor,
+            "model": model.state_dict(),
+            "optimizer": {"state": {}},
+        },
+        path,
+    )
+    yield path
+
+
+def test_load_checkpoint_int8(checkpoint_file, batch, mocker):
+    quantized, checkpoint = model_module.load_checkpoint(
+        str(checkpoint_file), precision="int8"
+    )
+    cache_file = checkpoint_file.parent / "model.int8.pt"
+    assert cache_file.exists()
+    assert "optimizer" not in checkpoint
+    # Second load reads the quantized cache, without loading the float checkpoint
+    spy = mocker.spy(model_module, "load_checkpoint")
+    cached, _ = model_module.load_checkpoint(str(checkpoint_file), precision="int8")
+    assert spy.call_count == 1
+    assert torch.equal(quantized.generate(batch)[0], cached.generate(batch)[0])
+    # Modified checkpoint invalidates the cache
+    stat = os.stat(checkpoint_file)
+    os.utime(checkpoint_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    model_module.load_checkpoint(str(checkpoint_file), precision="int8")
+    assert spy.call_count == 3
+
+
+def test_load_checkpoint_int8_no_cache(checkpoint_file):
+    model_module.load_checkpoint(str(checkpoint_file), precision="int8", cache=False)
+    assert not (checkpoint_file.parent / "model.int8.pt").exists()
+
+
+def test_load_checkpoint_int8_cache_path(checkpoint_file, tmp_path):
+    cache_file = tmp_path / "cache" / "quantized.pt"
+    model_module.load_checkpoint(
+        str(checkpoint_file), precision="int8", cache_path=str(cache_file)
+    )
+    assert cache_file.exists()
+    assert not (checkpoint_file.parent / "model.int8.pt").exists()
+    # Cache that can not be written, as its parent is a file
+    with pytest.warns(UserWarning, match="quantized checkpoint cache"):
+        model_module.load_checkpoint(
+            str(checkpoint_file),
+            precision="int8",
+            cache_path=str(cache_file / "quantized.pt"),
+        )
+
+
+@pytest.mark.parametrize(
+    "device, precision", [("cpu", "fp16"), ("cpu", "int4"), ("cuda", "int8")]
+)
+def test_load_checkpoint_ex(checkpoint_file, device, precision):
+    with pytest.raises(ValueError):
+        model_module.load_checkpoint(
+            str(checkpoint_file), device=device, precision=precision
+        )
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_script_model(model, batch, use_cache):
+    scripted = model_module.script_model(model)
+    out, probs = model.generate(batch, use_cache=use_cache)
+    out_s, probs_s = scripted.generate(batch, use_cache=use_cache)
+    assert torch.equal(out, out_s)
+    assert torch.allclose(probs, probs_s, atol=1e-5)
+
+
+def test_save_scripted(checkpoint_file, model, batch):
+    path = checkpoint_file.parent / "model.ts"
+    model_module.save_scripted(str(checkpoint_file), str(path), checksum="abc")
+    scripted, checkpoint = model_module.load_scripted(str(path), checksum="abc")
+    assert checkpoint["config"] == config
+    assert "phoneme_dict" not in checkpoint
+    tokenizer = checkpoint["preprocessor"].phoneme_tokenizer
+    assert tokenizer.end_index == model.end_index
+    assert torch.equal(scripted.generate(batch)[0], model.generate(batch)[0])
+    # Stale export of a different checkpoint
+    with pytest.raises(ValueError):
+        model_module.load_scripted(str(path), checksum="def")
+
+
+def test_save_scripted_version(checkpoint_file, monkeypatch):
+    path = checkpoint_file.parent / "model.ts"
+    model_module.save_scripted(str(checkpoint_file), str(path), checksum="abc")
+    # Export of another version of the decoding code
+    monkeypatch.setattr(
+        model_module, "_SCRIPTED_VERSION", model_module._SCRIPTED_VERSION + 1
+    )
+    with pytest.raises(ValueError, match="another version"):
+        model_module.load_scripted(str(path), checksum="abc")
+
+
+def test_numpy_model(checkpoint_file, model, batch):
+    numpy_transformer, checkpoint = numpy_model.load_numpy(str(checkpoint_file))
+    assert checkpoint["config"] == config
+    out, probs = model.generate(batch)
+    out_np, probs_np = numpy_transformer.generate(
+        batch["text"].numpy(), batch["start_index"].numpy()
+    )
+    assert out_np.shape == tuple(out.shape)
+    assert (out_np == out.numpy()).all()
+    assert abs(probs_np - probs.numpy()).max() < 1e-5
+
+
+def test_numpy_model_cache(checkpoint_file, mocker):
+    numpy_model.load_numpy(str(checkpoint_file))
+    assert (checkpoint_file.parent / "model.npz").exists()
+    # Second load reads the converted weights, without torch
+    spy = mocker.spy(numpy_model, "convert_checkpoint")
+    numpy_model.load_numpy(str(checkpoint_file))
+    assert spy.call_count == 0
+    # Modified checkpoint is converted again
+    stat = os.stat(checkpoint_file)
+    os.utime(checkpoint_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    numpy_model.load_numpy(str(checkpoint_file))
+    assert spy.call_count == 1
+
+
+def test_numpy_model_cache_path(checkpoint_file, tmp_path):
+    cache_file = tmp_path / "cache" / "weights.npz"
+    numpy_model.load_numpy(str(checkpoint_file), cache_path=str(cache_file))
+    assert cache_file.exists()
+    assert not (checkpoint_file.parent / "model.npz").exists()
+    # Weights file that can not be written, as its parent is a file
+    with pytest.warns(UserWarning, match="NumPy weights file"):
+        numpy_model.load_numpy(
+            str(checkpoint_file), cache_path=str(cache_file / "weights.npz")
+        )
+
+
+def test_numpy_predictor(checkpoint_file, model, preprocessor):
+    numpy_transformer, _ = numpy_model.load_numpy(str(checkpoint_file), cache=False)
+    predictor = Predictor(model, preprocessor)
+    numpy_predictor = numpy_model.NumpyPredictor(numpy_transformer, preprocessor)
+    texts = words + ["", "123", "b"]
+    for batch_size in (1, 4):
+        expected = predictor(texts, "en_us", batch_size=batch_size)
+        result = numpy_predictor(texts, "en_us", batch_size=batch_size)
+        for exp, res in zip(expected, result):
+            assert res.word == exp.word
+            assert res.phonemes == exp.phonemes
+            assert res.phoneme_tokens == exp.phoneme_tokens
+            assert res.confidence == pytest.approx(exp.confidence, abs=1e-5)
+
+
+@pytest.mark.parametrize(
+    "costs, budget, expected",
+    [
+        ([1, 2, 3, 4], 100, [[0, 1, 2, 3]]),
+        ([1, 2, 3, 4], 6, [[0, 1], [2], [3]]),
+        ([5, 5, 5, 5], 10, [[0, 1], [2, 3]]),
+        ([3, 50, 3], 10, [[0], [1], [2]]),  # Over budget rows are batched alone
+        ([], 10, []),
+    ],
+)
+def test_batchify_budget(costs, budget, expected):
+    assert u_batchify_budget(list(range(len(costs))), costs, budget) == expected
+
+
+def test_predictor_token_budget(checkpoint_file, model, preprocessor, mocker):
+    numpy_transformer, _ = numpy_model.load_numpy(str(checkpoint_file), cache=False)
+    texts = words * 3 + ["supercalifragilistic"]
+    for predictor in (
+        Predictor(model, preprocessor),
+        numpy_model.NumpyPredictor(numpy_transformer, preprocessor),
+    ):
+        expected = predictor(texts, "en_us", batch_size=8)
+        spy = mocker.spy(predictor.model, "generate")
+        result = predictor(texts, "en_us", token_budget=1000)
+        assert [r.phonemes for r in result] == [e.phonemes for e in expected]
+        # Short words share batches, long words are split into small ones
+        inputs = [call.args[0] for call in spy.call_args_list]
+        batch_sizes = [len(i["text"] if isinstance(i, dict) else i) for i in inputs]
+        assert max(batch_sizes) > 1
+        assert batch_sizes[-1] == 1
+
+
+@pytest.mark.parametrize("char_repeats", [1, 2])
+@pytest.mark.parametrize("append_start_end", [True, False])
+def test_encode_batch(char_repeats, append_start_end):
+    tokenizer = SequenceTokenizer(
+        symbols=list("abcdefghijklmnopqrstuvwxyz'-"),
+        languages=["en_us"],
+        char_repeats=char_repeats,
+        lowercase=True,
+        append_start_end=append_start_end,
+    )
+    texts = words + ["", "123", "Cat's", "-A-"]
+    # Characters outside the lookup array are tokenized one sentence at a time,
+    # including the kelvin sign that lower-cases to an ascii letter
+    for batch in (texts, texts + ["na\u00efve", "x\U0001f600y", "\u212a", "\ud800"]):
+        tokens, lengths = tokenizer.encode_batch(batch, "en_us")
+        assert tokens.shape == (len(batch), lengths.max())
+        for text, row, length in zip(batch, tokens.tolist(), lengths.tolist()):
+            expected = tokenizer(text, "en_us")
+            assert length == len(expected)
+            assert row == expected + [tokenizer.pad_index] * (len(row) - length)
+    tokens, lengths = tokenizer.encode_batch([], "en_us")
+    assert tokens.shape == (0, 0) and lengths.shape == (0,)
+    with pytest.raises(ValueError):
+        tokenizer.encode_batch(words, "fr")
@@ -0,0 +1,52 @@
+# Adversarial input benchmarks, each stage must stay linear in the input length
+import pytest
+
+from Aquila_Resolve.filter import filter_text
+from Aquila_Resolve.symbols import BraceIndex, valid_braces
+from Aquila_Resolve.text.numbers import normalize_numbers
+from Aquila_Resolve.text.replace import replace_first, replace_words
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+SIZE = 100000
+# Time ceiling per call, a quadratic scan of these inputs takes minutes
+CEILING_NS = 2e9
+
+cases = {
+    "long_word": "a" * SIZE,
+    "long_roman": "M" * SIZE,
+    "digits": "1" * SIZE,
+    "digits_unit": "1" * SIZE + "km",
+    "digits_ordinal": "1" * SIZE + "x",
+    "digits_comma": "1," * (SIZE // 2),
+    "digits_dot": "1." * (SIZE // 2),
+    "currency": "$" + "9" * SIZE,
+    "spaced_digits": "1 " * (SIZE // 2),
+    "deep_whitespace": "5" + " " * SIZE + "km",
+    "whitespace_words": ("word" + " " * 96) * (SIZE // 100),
+    "unclosed_brace": "{" + "1 " * (SIZE // 2),
+    "braced_digits": "{1 1} " * (SIZE // 6),
+}
+
+stages = {
+    "normalize_numbers": normalize_numbers,
+    "replace_first": lambda text: replace_first("word", "{W ER1 D}", text),
+    "replace_words": lambda text: replace_words([("word", "{W ER1 D}")] * 100, text),
+    "valid_braces": valid_braces,
+    "brace_index": BraceIndex,
+    "filter_text": filter_text,
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warmup():
+    normalize_numbers("12")  # Load inflect
+
+
+@pytest.mark.parametrize("stage", stages.keys())
+@pytest.mark.parametrize("case", cases.keys())
+def test_adversarial(case, stage):
+    with catch_time() as t:
+        stages[stage](cases[case])
+    assert t.time < CEILING_NS
@@ -0,0 +1,29 @@
+# Throughput of token budget batching against fixed size batches
+import pytest
+
+from Aquila_Resolve.batching import _sample_words, get_token_budget, num_threads
+from Aquila_Resolve.infer import Infer
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.fixture(scope="module")
+def words():
+    yield _sample_words(1000)
+
+
+@pytest.mark.parametrize("backend", ["torch", "numpy"])
+def test_token_budget(words, backend):
+    infer = Infer(backend=backend, scripted=False)
+    budget = get_token_budget(backend, num_threads(backend))
+    infer._predict(words[:32])  # Warmup
+    results, rates = {}, {}
+    for name, token_budget in (("fixed 32", None), (f"budget {budget}", budget)):
+        infer.token_budget = token_budget
+        with catch_time() as t:
+            results[name] = infer._predict(words)
+        rates[name] = len(words) / (t.time / 1e9)
+        print(f"{backend}, {name}: {rates[name]:.0f} words/s")
+    first, second = results.values()
+    assert first == second
@@ -0,0 +1,43 @@
+# Memory benchmark for streaming conversion
+import itertools
+import tracemalloc
+
+import pytest
+
+from Aquila_Resolve import G2p
+
+pytestmark = pytest.mark.perf
+
+lines = [
+    "The cat read the book. It was a good book to read.",
+    "You should absent yourself from the meeting. Then you would be absent.",
+    "The machine would automatically reject products. These were the reject products.",
+    "Alice and Bob walked to the markets, then bought three apples and some pears.",
+]
+
+
+@pytest.fixture(scope="module")
+def g2p():
+    yield G2p()
+
+
+def _peak_memory(g2p, count: int) -> int:
+    stream = itertools.islice(itertools.cycle(lines), count)
+    tracemalloc.start()
+    try:
+        for _ in g2p.convert_iter(stream, batch_size=64):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_convert_iter_memory(g2p):
+    _peak_memory(g2p, 64)  # Fill the lookup cache
+    small = _peak_memory(g2p, 1000)
+    large = _peak_memory(g2p, 10000)
+    print(
+        f"Peak memory: {small / 1024:.0f} KiB (1k lines), {large / 1024:.0f} KiB (10k)"
+    )
+    # Memory is bounded by the batch size, not the number of lines
+    assert large < small * 2
@@ -0,0 +1,40 @@
+# Scaling benchmark for parallel corpus conversion
+import io
+import os
+
+import pytest
+
+from Aquila_Resolve import G2p
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+lines = [
+    "The cat read the book. It was a good book to read.",
+    "You should absent yourself from the meeting. Then you would be absent.",
+    "The machine would automatically reject products. These were the reject products.",
+    "Alice and Bob walked to the markets, then bought three apples and some pears.",
+] * 500
+
+
+@pytest.fixture(scope="module")
+def g2p():
+    yield G2p()
+
+
+def _throughput(g2p, workers: int) -> float:
+    # Fresh cache, so each run does the same work
+    g2p.lookup_cache.clear()
+    with catch_time() as t:
+        g2p.convert_corpus(iter(lines), io.StringIO(), workers=workers, chunk_size=50)
+    return len(lines) / (t.time / 1e9)
+
+
+def test_corpus_scaling(g2p):
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, min(4, cpus)})
+    rates = {n: _throughput(g2p, n) for n in counts}
+    for n, rate in rates.items():
+        print(f"{n} workers: {rate:.0f} lines/s, speedup {rate / rates[1]:.2f}x")
+    if cpus >= 2:
+        assert rates[2] > rates[1] * 1.3
@@ -0,0 +1,30 @@
+# Benchmarks for text filtering
+import pytest
+
+from Aquila_Resolve.filter import filter_text, filter_many
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+lines = [
+    "The cat sat on the mat, then ran away!",
+    "I read the book yesterday, and I'll read it again.",
+    "Ünïcode lïnes like café {K AE0 F EY1} go through normalization.",
+    "Some   lines  have    extra spaces and symbols @#$%.",
+] * 2500
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warmup():
+    filter_many(lines[:10])  # Fill the translation tables
+
+
+def test_filter_text():
+    with catch_time():
+        for line in lines:
+            filter_text(line, preserve_case=True)
+
+
+def test_filter_many():
+    with catch_time():
+        filter_many(lines, preserve_case=True)
@@ -0,0 +1,103 @@
+# Benchmarks for autoregressive decoding of the transformer model
+import pytest
+import torch
+from torch.nn.utils.rnn import pad_sequence
+
+from Aquila_Resolve.infer import Infer
+from Aquila_Resolve.models.dp.model.model import script_model
+from Aquila_Resolve.models.dp.model.utils import _get_len_util_stop
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+# noinspection SpellCheckingInspection
+words = [
+    "a",
+    "cat",
+    "kalpe",
+    "hevinet",
+    "ioniformi",
+    "tensorflow",
+    "necrophages",
+    "agglomerative",
+    "supercalifragilistic",
+]
+
+
+@pytest.fixture(scope="module")
+def predictor():
+    yield Infer().model.predictor
+
+
+def make_batch(predictor, batch_words: list) -> dict:
+    """Tokenizes words to a model input batch"""
+    inputs = [torch.tensor(predictor.text_tokenizer(w, "en_us")) for w in batch_words]
+    start_index = predictor.phoneme_tokenizer._get_start_index("en_us")
+    return {
+        "text": pad_sequence(inputs, batch_first=True, padding_value=0),
+        "text_len": torch.tensor([len(i) for i in inputs]),
+        "start_index": torch.tensor([start_index] * len(inputs)),
+    }
+
+
+def test_generate_cached(predictor):
+    model = predictor.model
+    # Warmup
+    model.generate(make_batch(predictor, words))
+    times = {False: 0, True: 0}
+    for word in words:
+        batch = make_batch(predictor, [word])
+        results = {}
+        for use_cache in times:
+            with catch_time() as t:
+                results[use_cache] = model.generate(batch, use_cache=use_cache)
+            times[use_cache] += t.time
+        # Cached decoding must produce the same tokens
+        assert torch.equal(results[False][0], results[True][0])
+        assert torch.allclose(results[False][1], results[True][1], atol=1e-5)
+    print(
+        f"Per-word latency: {times[False] / len(words) / 1e6:.4f} ms (full), "
+        f"{times[True] / len(words) / 1e6:.4f} ms (cached)"
+    )
+    assert times[True] < times[False]
+
+
+def test_generate_mixed_batch(predictor):
+    model = predictor.model
+    end_index = predictor.phoneme_tokenizer.end_index
+    # Finished rows are dropped from the batch, results must match single word decoding
+    with catch_time():
+        batch_out, batch_probs = model.generate(make_batch(predictor, words * 4))
+    for i, word in enumerate(words * 4):
+        out, probs = model.generate(make_batch(predictor, [word]))
+        seq_len = _get_len_util_stop(out[0], end_index)
+        assert _get_len_util_stop(batch_out[i], end_index) == seq_len
+        assert torch.equal(batch_out[i, :seq_len], out[0, :seq_len])
+        assert torch.allclose(batch_probs[i, :seq_len], probs[0, :seq_len], atol=1e-5)
+
+
+@pytest.mark.parametrize("size", [1, 4])
+def test_generate_scripted(predictor, size):
+    model = predictor.model
+    scripted = script_model(model)
+    batches = [
+        make_batch(predictor, words[i : i + size]) for i in range(0, len(words), size)
+    ]
+    times = {}
+    for name, m in (("eager", model), ("scripted", scripted)):
+        m.generate(batches[0])  # Warmup, the scripted module is optimized on first runs
+        m.generate(batches[0])
+        with catch_time() as t:
+            for batch in batches:
+                out, probs = m.generate(batch)
+        times[name] = t.time
+    for batch in batches:
+        out, probs = model.generate(batch)
+        out_s, probs_s = scripted.generate(batch)
+        assert torch.equal(out, out_s)
+        assert torch.allclose(probs, probs_s, atol=1e-5)
+    print(
+        f"Batch size {size} latency: {times['eager'] / len(batches) / 1e6:.4f} ms (eager), "
+        f"{times['scripted'] / len(batches) / 1e6:.4f} ms (scripted)"
+    )
+    assert times["scripted"] < times["eager"]
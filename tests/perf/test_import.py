@@ -0,0 +1,54 @@
+# Import time regression tests
+import json
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.perf
+
+# Modules that should only be loaded when the features needing them are used
+HEAVY_MODULES = ("torch", "nltk", "inflect")
+
+_SCRIPT = """
+import json, sys, time
+t = time.perf_counter_ns()
+import {module}
+t = time.perf_counter_ns() - t
+print(json.dumps({{"time": t, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _import(module: str) -> dict:
+    # Fresh interpreter, so modules loaded by the test session do not count
+    script = _SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "Aquila_Resolve",
+        "Aquila_Resolve.format_ph",
+        "Aquila_Resolve.symbols",
+        "Aquila_Resolve.text.numbers",
+    ],
+)
+def test_import_light(module):
+    result = _import(module)
+    print(f"Import {module}: {(result['time'] / 1e6):.4f} ms")
+    assert result["loaded"] == []
+    # Generous ceiling, a heavy import (torch, nltk) takes several seconds
+    assert result["time"] < 1e9
+
+
+def test_lazy_attributes():
+    import Aquila_Resolve
+
+    assert callable(Aquila_Resolve.download)
+    assert Aquila_Resolve.G2p.__name__ == "G2p"
+    with pytest.raises(AttributeError):
+        getattr(Aquila_Resolve, "not_an_attribute")
@@ -0,0 +1,45 @@
+# Benchmarks for number normalization of long text
+import random
+
+import pytest
+
+from Aquila_Resolve.text.numbers import normalize_numbers
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+words = ["the", "cat", "paid", "$5", "for", "12", "items", "in", "1999", "at"]
+words += ["3.5", "km", "and", "1,200", "on", "the", "3rd", "day", "XIV"]
+
+
+def make_document(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    result = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        result.append(word)
+        length += len(word) + 1
+    return " ".join(result)
+
+
+@pytest.fixture(scope="module")
+def document():
+    text = make_document(100000)
+    normalize_numbers(text[:1000])  # Load inflect
+    yield text
+
+
+def test_normalize_numbers(document):
+    with catch_time():
+        normalize_numbers(document)
+
+
+def test_normalize_numbers_linear(document):
+    half = document[: len(document) // 2]
+    with catch_time() as t_half:
+        normalize_numbers(half)
+    with catch_time() as t_full:
+        normalize_numbers(document)
+    # Double the text should take about double the time, quadratic would be 4x
+    assert t_full.time < t_half.time * 3
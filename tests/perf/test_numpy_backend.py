@@ -0,0 +1,66 @@
+# Startup cost and throughput of the NumPy inference backend
+import json
+import subprocess
+import sys
+
+import pytest
+
+from Aquila_Resolve.infer import Infer
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+# noinspection SpellCheckingInspection
+words = ["kalpe", "hevinet", "ioniformi", "tensorflow", "necrophages", "agglomerative"]
+
+_STARTUP_SCRIPT = """
+import json, os, sys, time
+t = time.perf_counter_ns()
+from Aquila_Resolve.infer import Infer
+Infer(backend={backend!r}, scripted=False)(["ioniformi"])
+t = time.perf_counter_ns() - t
+with open("/proc/self/statm") as f:
+    rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+print(json.dumps({{"time": t, "rss": rss, "torch": "torch" in sys.modules}}))
+"""
+
+
+def _startup(backend: str) -> dict:
+    # Fresh interpreter, so modules loaded by the test session do not count
+    script = _STARTUP_SCRIPT.format(backend=backend)
+    out = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Reads /proc")
+def test_numpy_startup():
+    Infer(backend="numpy", lazy=True).load()  # Converts the weights file if needed
+    results = {backend: _startup(backend) for backend in ("torch", "numpy")}
+    for backend, result in results.items():
+        print(
+            f"{backend}: first prediction in {result['time'] / 1e6:.1f} ms, "
+            f"RSS {result['rss'] / 2**20:.1f} MiB"
+        )
+    assert not results["numpy"]["torch"]
+    assert results["numpy"]["time"] < results["torch"]["time"]
+    assert results["numpy"]["rss"] < results["torch"]["rss"]
+
+
+@pytest.mark.parametrize("batch_size", [1, 32])
+def test_numpy_throughput(batch_size):
+    infers = {
+        backend: Infer(backend=backend, scripted=False)
+        for backend in ("torch", "numpy")
+    }
+    results = {}
+    for backend, infer in infers.items():
+        infer.token_budget = None  # Fixed size batches
+        infer.batch_size = batch_size
+        infer(words)  # Warmup
+        with catch_time() as t:
+            results[backend] = infer(words * 10)
+        rate = len(words) * 10 / (t.time / 1e9)
+        print(f"{backend}, batch size {batch_size}: {rate:.0f} words/s")
+    assert results["numpy"] == results["torch"]
@@ -0,0 +1,67 @@
+# Benchmarks for token probability extraction and stop-length detection
+import pytest
+import torch
+
+from Aquila_Resolve.models.dp.model.utils import (
+    _get_len_util_stop,
+    _get_lens_util_stop,
+    _get_token_probs,
+)
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+end_index = 3
+
+
+def token_probs_loop(logits: torch.Tensor) -> torch.Tensor:
+    """Reference implementation using a loop over batch and time"""
+    logits = logits.softmax(-1)
+    probs = torch.ones((logits.size(0), logits.size(1) + 1))
+    for i in range(logits.size(0)):
+        for j in range(logits.size(1)):
+            probs[i, j + 1] = logits[i, j].max()
+    return probs
+
+
+def len_util_stop_loop(sequence: torch.Tensor) -> int:
+    """Reference implementation iterating over each element"""
+    for i, val in enumerate(sequence):
+        if val == end_index:
+            return i + 1
+    return len(sequence)
+
+
+@pytest.fixture(scope="module")
+def logits():
+    torch.manual_seed(0)
+    yield torch.randn(64, 30, 80)
+
+
+@pytest.fixture(scope="module")
+def sequences():
+    torch.manual_seed(0)
+    seqs = torch.randint(4, 80, (64, 30))
+    # Place end indices at varying positions, leaving some rows without one
+    for i in range(0, 64, 2):
+        seqs[i, (i * 7) % 30 :] = end_index
+    yield seqs
+
+
+def test_token_probs(logits):
+    with catch_time() as t_loop:
+        expected = token_probs_loop(logits)
+    with catch_time() as t_vec:
+        result = _get_token_probs(logits)
+    assert torch.equal(result, expected)
+    assert t_vec.time < t_loop.time
+
+
+def test_len_util_stop(sequences):
+    with catch_time() as t_loop:
+        expected = [len_util_stop_loop(seq) for seq in sequences]
+    with catch_time() as t_vec:
+        result = _get_lens_util_stop(sequences, end_index).tolist()
+    assert result == expected
+    assert [_get_len_util_stop(seq, end_index) for seq in sequences] == expected
+    assert t_vec.time < t_loop.time
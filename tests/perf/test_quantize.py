@@ -0,0 +1,81 @@
+# Accuracy parity and throughput of int8 quantized inference
+import pytest
+
+from Aquila_Resolve.infer import Infer
+from Aquila_Resolve.static_dict import get_cmudict
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+# Held-out words, not in the CMU Dictionary the model is trained on, with accepted pronunciations
+# noinspection SpellCheckingInspection
+held_out = {
+    "cryptocurrency": ["K R IH2 P T OW0 K ER1 AH0 N S IY0"],
+    "emoji": ["IH0 M OW1 JH IY0", "IY0 M OW1 JH IY0"],
+    "livestream": ["L AY1 V S T R IY2 M"],
+    "photobomb": ["F OW1 T OW0 B AA2 M"],
+    "unfriend": ["AH0 N F R EH1 N D"],
+    "crowdfunding": ["K R AW1 D F AH2 N D IH0 NG"],
+    "ebook": ["IY1 B UH2 K"],
+    "vlog": ["V L AO1 G", "V L AA1 G"],
+    "vlogger": ["V L AO1 G ER0", "V L AA1 G ER0"],
+    "retweet": ["R IY0 T W IY1 T", "R IY1 T W IY2 T"],
+    "geotag": ["JH IY1 OW0 T AE2 G"],
+    "chatbot": ["CH AE1 T B AA2 T"],
+    "metaverse": ["M EH1 T AH0 V ER2 S"],
+    "cyberbully": ["S AY1 B ER0 B UH2 L IY0"],
+    "influencer": ["IH1 N F L UW0 AH0 N S ER0"],
+    "staycation": ["S T EY0 K EY1 SH AH0 N"],
+    "glamping": ["G L AE1 M P IH0 NG"],
+    "bromance": ["B R OW1 M AE2 N S"],
+    "hangry": ["HH AE1 NG G R IY0"],
+    "frenemy": ["F R EH1 N AH0 M IY0"],
+    "dongle": ["D AO1 NG G AH0 L", "D AA1 NG G AH0 L"],
+    "doomscroll": ["D UW1 M S K R OW2 L"],
+    "upcycle": ["AH1 P S AY2 K AH0 L"],
+    "smartwatch": ["S M AA1 R T W AA2 CH"],
+    "touchscreen": ["T AH1 CH S K R IY2 N"],
+    "webcam": ["W EH1 B K AE2 M"],
+    "ransomware": ["R AE1 N S AH0 M W EH2 R"],
+    "adware": ["AE1 D W EH2 R"],
+    "cosplay": ["K AA1 S P L EY2"],
+    "crowdsource": ["K R AW1 D S AO2 R S"],
+    "deepfake": ["D IY1 P F EY2 K"],
+    "ghosting": ["G OW1 S T IH0 NG"],
+    "hoverboard": ["HH AH1 V ER0 B AO2 R D"],
+    "jeggings": ["JH EH1 G IH0 NG Z"],
+    "netizen": ["N EH1 T IH0 Z AH0 N"],
+    "overshare": ["OW1 V ER0 SH EH2 R"],
+    "paywall": ["P EY1 W AO2 L"],
+    "vaping": ["V EY1 P IH0 NG"],
+    "microplastic": ["M AY1 K R OW0 P L AE2 S T IH0 K"],
+}
+
+
+@pytest.fixture(scope="module")
+def infers():
+    yield {precision: Infer(precision=precision) for precision in ("fp32", "int8")}
+
+
+def test_held_out():
+    cmu = get_cmudict()
+    assert not [word for word in held_out if word in cmu]
+
+
+def test_quantized_parity(infers):
+    words = list(held_out)
+    results, correct = {}, {}
+    for precision, infer in infers.items():
+        with catch_time() as t:
+            results[precision] = infer(words)
+        correct[precision] = sum(
+            p in held_out[w] for w, p in zip(words, results[precision])
+        )
+        rate = len(words) / (t.time / 1e9)
+        print(
+            f"{precision}: {correct[precision]} of {len(words)} correct, {rate:.0f} words/s"
+        )
+    agreement = sum(a == b for a, b in zip(results["fp32"], results["int8"]))
+    print(f"int8 agrees with fp32 on {agreement} of {len(words)} words")
+    # At most one more held-out word wrong than the fp32 model
+    assert correct["int8"] >= correct["fp32"] - 1
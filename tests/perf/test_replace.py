@@ -0,0 +1,43 @@
+# Benchmarks for phoneme substitution of long text
+import random
+
+import pytest
+
+from Aquila_Resolve.static_dict import get_cmudict
+from Aquila_Resolve.text.replace import replace_first, replace_words
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.fixture(scope="module")
+def paragraph():
+    rng = random.Random(0)
+    vocab = [word for word in get_cmudict() if word.isalpha()][:5000]
+    words = [rng.choice(vocab) for _ in range(2000)]
+    yield " ".join(words), [(word, "{" + word.upper() + "}") for word in words]
+
+
+def test_replace_first_loop(paragraph):
+    text, pairs = paragraph
+    with catch_time():
+        for target, replacement in pairs:
+            text = replace_first(target, replacement, text)
+
+
+def test_replace_words(paragraph):
+    text, pairs = paragraph
+    assert len(text) > 10000
+    with catch_time():
+        replace_words(pairs, text)
+
+
+def test_replace_words_linear(paragraph):
+    text, pairs = paragraph
+    replace_words(pairs, text)  # Warm the pattern cache
+    with catch_time() as t_single:
+        replace_words(pairs, text)
+    with catch_time() as t_repeat:
+        replace_words(pairs * 8, " ".join([text] * 8))
+    # 8x the text should take about 8x the time, quadratic would be 64x
+    assert t_repeat.time < t_single.time * 24
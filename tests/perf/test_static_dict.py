@@ -0,0 +1,89 @@
+# Performance tests for dictionary loading
+import json
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from Aquila_Resolve import static_dict
+from Aquila_Resolve.data import DATA_PATH
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+
+@pytest.fixture(scope="module")
+def cmu_file(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cmudict") / "cmudict.json.gz"
+    shutil.copy(str(DATA_PATH.joinpath("cmudict.json.gz")), path)
+    static_dict.compile_cmudict(path)
+    yield path
+
+
+def test_load_json(cmu_file):
+    with catch_time():
+        static_dict.get_cmudict(cmu_file)
+
+
+def test_load_mmap(cmu_file):
+    with catch_time() as t_mmap:
+        cd = static_dict.get_cmudict(cmu_file, mmap=True)
+    with catch_time() as t_json:
+        static_dict.get_cmudict(cmu_file)
+    # Mapping the compiled file does not parse the dictionary
+    assert t_mmap.time < t_json.time
+    cd.close()
+
+
+def test_lookup_mmap(cmu_file):
+    words = list(static_dict.get_cmudict(cmu_file))[::100]
+    cd = static_dict.get_cmudict(cmu_file, mmap=True)
+    with catch_time():
+        for word in words:
+            _ = cd[word]
+    cd.close()
+
+
+def test_lookup_compact(cmu_file):
+    words = list(static_dict.get_cmudict(cmu_file))[::100]
+    cd = static_dict.get_cmudict(cmu_file, compact=True)
+    with catch_time():
+        for word in words:
+            _ = cd[word]
+
+
+_RSS_SCRIPT = """
+import gc, json, os
+from Aquila_Resolve import static_dict
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+before = rss()
+cd = static_dict.get_cmudict({filename!r}, compact={compact!r})
+gc.collect()
+print(json.dumps(rss() - before))
+"""
+
+
+def _load_rss(filename, compact: bool) -> int:
+    # Fresh interpreter, so memory of the test session does not count
+    script = _RSS_SCRIPT.format(filename=str(filename), compact=compact)
+    out = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Reads /proc")
+def test_rss_compact(cmu_file):
+    rss_dict = _load_rss(cmu_file, compact=False)
+    rss_compact = _load_rss(cmu_file, compact=True)
+    saved = rss_dict - rss_compact
+    print(
+        f"RSS dict: {rss_dict / 2**20:.1f} MiB, compact: {rss_compact / 2**20:.1f} MiB, "
+        f"saved: {saved / 2**20:.1f} MiB ({saved / rss_dict:.0%})"
+    )
+    assert rss_compact < rss_dict / 2
@@ -0,0 +1,64 @@
+# Benchmarks for part of speech tagging
+import pytest
+from nltk import pos_tag
+
+from Aquila_Resolve.h2p import H2p
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+# noinspection SpellCheckingInspection
+lines = [
+    "The cat read the book. It was a good book to read.",
+    "You should absent yourself from the meeting. Then you would be absent.",
+    "The machine would automatically reject products. These were the reject products.",
+    "Alice and Bob walked to the markets, then bought three apples and some pears.",
+] * 50
+
+
+@pytest.fixture(scope="module")
+def h2p():
+    yield H2p(preload=True)
+
+
+@pytest.fixture(scope="module")
+def sentences(h2p):
+    yield [h2p.tokenize(line) for line in lines]
+
+
+def _rate(sentences, time_ns) -> float:
+    return sum(len(words) for words in sentences) / (time_ns / 1e9)
+
+
+def test_tag_nltk(sentences):
+    with catch_time() as t:
+        for words in sentences:
+            pos_tag(words)
+    print(f"nltk.pos_tag: {_rate(sentences, t.time):.0f} tags/s")
+
+
+def test_tag_single(h2p, sentences):
+    with catch_time() as t:
+        for words in sentences:
+            h2p.get_tags(words)
+    print(f"H2p.get_tags: {_rate(sentences, t.time):.0f} tags/s")
+
+
+def test_tag_many(h2p, sentences):
+    with catch_time() as t:
+        h2p.tag_many(sentences)
+    print(f"H2p.tag_many: {_rate(sentences, t.time):.0f} tags/s")
+
+
+def test_tag_words(h2p, sentences):
+    words = [word for words in sentences for word in words]
+    h2p._tag_cache.clear()
+    with catch_time() as t_cold:
+        for word in words:
+            h2p.tag(word)
+    with catch_time() as t_warm:
+        for word in words:
+            h2p.tag(word)
+    print(f"H2p.tag cold: {len(words) / (t_cold.time / 1e9):.0f} words/s")
+    print(f"H2p.tag warm: {len(words) / (t_warm.time / 1e9):.0f} words/s")
+    assert t_warm.time < t_cold.time
@@ -0,0 +1,48 @@
+# Benchmarks for batch tokenization of model inputs
+import re
+
+import numpy as np
+import pytest
+
+from Aquila_Resolve.models.dp.preprocessing.text import SequenceTokenizer
+from Aquila_Resolve.static_dict import get_cmudict
+from .utils import catch_time
+
+pytestmark = pytest.mark.perf
+
+re_variant = re.compile(r"\(\d+\)$")
+
+
+def encode_loop(tokenizer: SequenceTokenizer, texts: list) -> np.ndarray:
+    """Reference implementation tokenizing and padding one sentence at a time"""
+    sequences = [tokenizer(text, "en_us") for text in texts]
+    tokens = np.zeros((len(texts), max(len(s) for s in sequences)), dtype=np.int64)
+    for row, seq in zip(tokens, sequences):
+        row[: len(seq)] = seq
+    return tokens
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    yield SequenceTokenizer(
+        symbols=list("abcdefghijklmnopqrstuvwxyz'-"),
+        languages=["en_us"],
+        char_repeats=1,
+        lowercase=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def texts():
+    yield sorted({re_variant.sub("", w) for w in get_cmudict()})[:20000]
+
+
+def test_encode_batch(tokenizer, texts):
+    tokenizer.encode_batch(texts[:8], "en_us")  # Builds the lookup array
+    with catch_time() as t_loop:
+        expected = encode_loop(tokenizer, texts)
+    with catch_time() as t_vec:
+        result, _ = tokenizer.encode_batch(texts, "en_us")
+    print(f"\nloop: {t_loop.time / 1e6:.1f} ms, batch: {t_vec.time / 1e6:.1f} ms")
+    assert np.array_equal(result, expected)
+    assert t_vec.time < t_loop.time
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from Aquila_Resolve import batching
+from Aquila_Resolve.infer import Infer
+
+
+def test_get_token_budget(tmp_path):
+    path = tmp_path / "batching.json"
+    assert batching.get_token_budget("torch", 4, path) == batching.DEFAULT_TOKEN_BUDGET
+    path.write_text(json.dumps({"torch:4": 2048, "numpy:4": 4096}))
+    assert batching.get_token_budget("torch", 4, path) == 2048
+    assert batching.get_token_budget("numpy", 4, path) == 4096
+    assert batching.get_token_budget("torch", 2, path) == batching.DEFAULT_TOKEN_BUDGET
+    path.write_text("{")  # Invalid config is ignored
+    assert batching.get_token_budget("torch", 4, path) == batching.DEFAULT_TOKEN_BUDGET
+
+
+# noinspection SpellCheckingInspection
+def test_tune_token_budget(tmp_path):
+    path = tmp_path / "batching.json"
+    path.write_text(json.dumps({"numpy:1": 1024}))
+    infer = Infer(lazy=True)
+    words = ["a", "cat", "kalpe", "hevinet", "ioniformi", "agglomerative"] * 5
+    rates = batching.tune_token_budget(
+        infer, budgets=(512, 8192), words=words, path=path
+    )
+    assert set(rates) == {512, 8192}
+    best = max(rates, key=rates.get)
+    assert infer.token_budget == best
+    threads = batching.num_threads("torch")
+    assert batching.get_token_budget("torch", threads, path) == best
+    # Entries of other backends and thread counts are kept
+    assert batching.get_token_budget("numpy", 1, path) == 1024
+
+
+def test_tune_token_budget_readonly(tmp_path):
+    # Config path that can not be written, as its parent is a file
+    (tmp_path / "file").write_text("")
+    infer = Infer(lazy=True)
+    with pytest.warns(UserWarning, match="budget not saved"):
+        rates = batching.tune_token_budget(
+            infer, budgets=(512,), words=["cat"], path=tmp_path / "file" / "b.json"
+        )
+    assert infer.token_budget == 512
+    assert set(rates) == {512}
+
+
+def test_config_path(cache_dir):
+    assert batching.config_path() == str(cache_dir / "batching.json")
+    assert batching.get_token_budget("torch", 4) == batching.DEFAULT_TOKEN_BUDGET
+
+
+@pytest.mark.parametrize("backend", ["torch", "numpy"])
+def test_infer_token_budget(backend):
+    infer = Infer(backend=backend, token_budget=100)
+    assert infer.token_budget == 100
+    assert infer(["ioniformi"]) == ["IY0 AA2 N IH0 F AO1 R M IY0"]
@@ -0,0 +1,166 @@
+import multiprocessing
+
+import pytest
+from Aquila_Resolve import cache as cache_module
+from Aquila_Resolve.cache import PredictionCache, LRUCache
+
+
+@pytest.fixture
+def model_file(tmp_path):
+    path = tmp_path / "model.pt"
+    path.write_bytes(b"model")
+    yield path
+
+
+@pytest.fixture
+def cache(tmp_path, model_file):
+    cache = PredictionCache(tmp_path / "cache.db", model_file, max_size=3)
+    yield cache
+    cache.close()
+
+
+def test_get_set(cache):
+    assert cache.get_many("en_us", ["cat"]) == {}
+    cache.set_many("en_us", {"cat": "K AE1 T", "dog": "D AO1 G"})
+    assert cache.get_many("en_us", ["cat", "dog", "cat", "fish"]) == {
+        "cat": "K AE1 T",
+        "dog": "D AO1 G",
+    }
+    # Entries are separate for each language
+    assert cache.get_many("en_gb", ["cat"]) == {}
+    assert len(cache) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_eviction(tmp_path, model_file):
+    cache = PredictionCache(tmp_path / "cache.db", model_file, max_size=3, touch_age=0)
+    cache.set_many("en_us", {"a": "AH0", "b": "B IY1", "c": "S IY1"})
+    cache.get_many("en_us", ["a"])  # Mark as recently used
+    cache.set_many("en_us", {"d": "D IY1"})
+    assert len(cache) == 3
+    assert set(cache.get_many("en_us", ["a", "b", "c", "d"])) == {"a", "c", "d"}
+    cache.close()
+
+
+def test_eviction_batched(tmp_path, model_file, mocker):
+    cache = PredictionCache(tmp_path / "cache.db", model_file, max_size=20)
+    spy = mocker.spy(PredictionCache, "__len__")
+    for i in range(30):
+        cache.set_many("en_us", {f"w{i}": "AH0"})
+    # Only counted when the bound is passed, at the 21st entry then every third addition,
+    # as entries are evicted down to 18
+    assert spy.call_count == 4
+    assert len(cache) == 18
+    cache.close()
+
+
+def test_get_no_write(cache):
+    cache.set_many("en_us", {"cat": "K AE1 T"})
+    used = cache._conn.execute("SELECT used FROM predictions").fetchone()[0]
+    assert cache.get_many("en_us", ["cat"]) == {"cat": "K AE1 T"}
+    # Recently used entries are not written again
+    assert cache._conn.execute("SELECT used FROM predictions").fetchone()[0] == used
+    cache._conn.execute("UPDATE predictions SET used = 0")
+    cache._conn.commit()
+    assert cache.get_many("en_us", ["cat"]) == {"cat": "K AE1 T"}
+    assert cache._conn.execute("SELECT used FROM predictions").fetchone()[0] > 0
+
+
+def test_shared(tmp_path, cache, model_file):
+    cache.set_many("en_us", {"cat": "K AE1 T"})
+    other = PredictionCache(tmp_path / "cache.db", model_file)
+    assert other.get_many("en_us", ["cat"]) == {"cat": "K AE1 T"}
+    other.close()
+
+
+def _set_in_child(cache):
+    cache.reopen()
+    cache.set_many("en_us", {"fish": "F IH1 SH"})
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="Requires fork"
+)
+def test_reopen_forked(cache):
+    cache.set_many("en_us", {"cat": "K AE1 T"})
+    process = multiprocessing.get_context("fork").Process(
+        target=_set_in_child, args=(cache,)
+    )
+    process.start()
+    process.join()
+    assert process.exitcode == 0
+    assert cache.get_many("en_us", ["cat", "fish"]) == {
+        "cat": "K AE1 T",
+        "fish": "F IH1 SH",
+    }
+
+
+def test_invalidation(tmp_path, cache, model_file, mocker):
+    cache.set_many("en_us", {"cat": "K AE1 T"})
+    spy = mocker.spy(cache_module, "get_checksum")
+    # Unchanged model, entries kept without hashing the model again
+    other = PredictionCache(tmp_path / "cache.db", model_file)
+    assert other.checksum == cache.checksum
+    assert len(other) == 1
+    other.close()
+    # Changed model, entries of the old model are kept but not returned
+    model_file.write_bytes(b"new model")
+    other = PredictionCache(tmp_path / "cache.db", model_file)
+    assert other.checksum != cache.checksum
+    assert other.get_many("en_us", ["cat"]) == {}
+    assert len(other) == 1
+    other.close()
+    assert spy.call_count == 1
+    # Entries of other models are removed once stale
+    other = PredictionCache(tmp_path / "cache.db", model_file, stale_age=-1)
+    assert len(other) == 0
+    other.close()
+
+
+def test_variants(tmp_path, model_file):
+    # Caches of different precisions share a file without removing each other's entries
+    fp32 = PredictionCache(tmp_path / "cache.db", model_file)
+    fp32.set_many("en_us", {"cat": "K AE1 T"})
+    int8 = PredictionCache(tmp_path / "cache.db", model_file, variant="int8")
+    int8.set_many("en_us", {"cat": "K AE1 T D"})
+    assert fp32.get_many("en_us", ["cat"]) == {"cat": "K AE1 T"}
+    assert int8.get_many("en_us", ["cat"]) == {"cat": "K AE1 T D"}
+    fp32.close()
+    int8.close()
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=2)
+    assert cache.get("a") is None
+    cache.put("a", "AH0")
+    cache.put("b", None)
+    assert cache.get("a") == "AH0"
+    assert cache.get("b", "missing") is None
+    assert cache.peek("b") is None and cache.peek("x", "missing") == "missing"
+    cache.put("c", "S IY1")  # Evicts least recently used "a"
+    assert "a" not in cache
+    assert len(cache) == 2
+    assert cache.info()["hits"] == 2
+    assert cache.info()["misses"] == 1
+    assert cache.info()["evictions"] == 1
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.bytes == 0
+    assert cache.info()["hits"] == 0
+
+
+def test_lru_cache_bytes():
+    cache = LRUCache(max_size=None, max_bytes=None)
+    for i in range(100):
+        cache.put(("word" + str(i), True), "AH0 " * 10)
+    assert len(cache) == 100
+    entry_bytes = cache.bytes // 100
+    cache.resize(max_bytes=entry_bytes * 10)
+    assert len(cache) <= 10
+    assert cache.bytes <= entry_bytes * 10
+    assert cache.evictions >= 90
+    # Most recent entries are kept
+    assert ("word99", True) in cache
+    cache.resize(max_size=1)
+    assert len(cache) == 1
@@ -0,0 +1,53 @@
+import io
+
+import pytest
+
+from Aquila_Resolve import G2p
+from Aquila_Resolve.corpus import read_lines, iter_corpus
+
+lines = [
+    "The cat read the book. It was a good book to read.",
+    "You should absent yourself from the meeting.",
+    "The cat {R IY1 D} the book.",
+    "It costs $5.",
+    "",
+] * 7
+
+
+@pytest.fixture(scope="module")
+def g2p() -> G2p:
+    yield G2p()
+
+
+def test_read_lines(tmp_path):
+    path = tmp_path / "corpus.txt"
+    path.write_text("first line\nsecond line\r\n\nlast", encoding="utf-8")
+    expected = ["first line", "second line", "", "last"]
+    assert list(read_lines(path)) == expected
+    assert list(read_lines(str(path))) == expected
+    assert list(read_lines([path, path])) == expected * 2
+    assert list(read_lines(iter(["a\n", "b"]))) == ["a", "b"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_iter_corpus(g2p, workers):
+    results = iter_corpus(g2p, iter(lines), workers=workers, chunk_size=3)
+    assert list(results) == g2p.convert_batch(lines)
+
+
+def test_convert_corpus(g2p, tmp_path):
+    src = tmp_path / "corpus.txt"
+    src.write_text("".join(f"{line}\n" for line in lines), encoding="utf-8")
+    out = tmp_path / "out.txt"
+    assert g2p.convert_corpus(src, out, workers=2, chunk_size=4) == len(lines)
+    expected = g2p.convert_batch(lines)
+    assert out.read_text(encoding="utf-8") == "".join(f"{r}\n" for r in expected)
+    # Writable stream output
+    stream = io.StringIO()
+    assert g2p.convert_corpus([src], stream, workers=2) == len(lines)
+    assert stream.getvalue() == out.read_text(encoding="utf-8")
+
+
+def test_convert_corpus_ex(g2p):
+    with pytest.raises(ValueError):
+        g2p.convert_corpus(iter(["Fine line.", "Bad {line"]), io.StringIO(), workers=2)
@@ -5,6 +5,7 @@ import unittest.mock as mock
 
 from Aquila_Resolve.dictionary import Dictionary
 import Aquila_Resolve.dictionary as dictionary
+from Aquila_Resolve.symbols import pos_tags
 
 
 # Test initialization of dictionary from confTest
@@ -59,6 +60,20 @@ def test_contains(data, exp, mock_dict):
     assert mock_dict.contains(data) is exp
 
 
+# Test contains_any
+@pytest.mark.parametrize(
+    "data, exp",
+    [
+        (["The", "cat", "was", "ABsent"], True),
+        (["reject"], True),
+        (["another", "word"], False),
+        ([], False),
+    ],
+)
+def test_contains_any(data, exp, mock_dict):
+    assert mock_dict.contains_any(data) is exp
+
+
 # Test get_phoneme
 @pytest.mark.parametrize(
     "word, pos, phoneme",
@@ -84,3 +99,39 @@ def test_get_phoneme(word, pos, phoneme, mock_dict):
 def test_get_phoneme_key_error(mock_dict):
     with pytest.raises(KeyError):
         mock_dict.get_phoneme("notfound", "NN")
+
+
+# Test get_phoneme for pos tags outside the compiled table
+@pytest.mark.parametrize(
+    "word, pos, phoneme",
+    [
+        ("read", None, "R IY1 D"),
+        ("read", "VERB", "R IY1 D"),
+        ("absent", "VERB", "AH1 B S AE1 N T"),
+        ("absent", ".", "AE1 B S AH0 N T"),
+    ],
+)
+def test_get_phoneme_uncompiled(word, pos, phoneme, mock_dict):
+    assert (word, pos) not in mock_dict.table
+    assert mock_dict.get_phoneme(word, pos) == phoneme
+
+
+# Test that the compiled table covers every pos tag
+def test_compile_table(mock_dict):
+    table = dictionary.compile_table(mock_dict.dictionary)
+    for (word, pos), phoneme in table.items():
+        assert phoneme == dictionary._resolve(mock_dict.dictionary[word], pos)
+    assert len(table) == len(mock_dict.dictionary) * len(pos_tags)
+
+
+# Test that words are compiled into the table on first lookup
+def test_table_lazy(tmp_path):
+    path = tmp_path / "custom_dict.json"
+    path.write_text(json.dumps({"read": {"VBD": "R EH1 D", "DEFAULT": "R IY1 D"}}))
+    result = Dictionary(str(path))
+    assert result.table == {}
+    assert result.get_phoneme("Read", "VBD") == "R EH1 D"
+    assert len(result.table) == len(pos_tags)
+    assert result.get_phoneme("read", "NN") == "R IY1 D"
+    assert len(result.table) == len(pos_tags)
+    assert list(tmp_path.iterdir()) == [path]
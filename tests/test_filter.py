@@ -76,3 +76,38 @@ def test_filter_text_spaces(source, expected):
 def test_filter_text_numbers(source, expected, mode_on):
     result = h2p_filter.filter_text(source, mode_on)
     assert result == expected
+
+
+# Test for removal of combining marks and non-ascii characters
+@pytest.mark.parametrize(
+    "source, expected, mode_on",
+    [
+        ("café", "cafe", False),  # Decomposed accent
+        ("İstanbul", "istanbul", False),
+        ("Straße 日本", "strae ", False),
+        ("tab\tand\nnewline", "tabandnewline", False),
+        ("a   b", "a b", False),
+        ("٣ and 3", "٣ and 3", True),
+        ("٣ and 3", " and ", False),
+    ],
+)
+def test_filter_text_unicode(source, expected, mode_on):
+    result = h2p_filter.filter_text(source, mode_on)
+    assert result == expected
+
+
+# Test the batch filter gives the same results as filtering each text
+@pytest.mark.parametrize("allow_num", [False, True])
+@pytest.mark.parametrize("preserve_case", [False, True])
+@pytest.mark.parametrize(
+    "texts",
+    [
+        [],
+        ["Single  Líne 1"],
+        ["Ünïcode  Line 1,", "", "  Second @ line 2!  ", "{B AH1} {T}"],
+        ["Has a\nnewline", "Tab\tline", "Plain"],  # Newlines are not separators
+    ],
+)
+def test_filter_many(texts, allow_num, preserve_case):
+    expected = [h2p_filter.filter_text(t, allow_num, preserve_case) for t in texts]
+    assert h2p_filter.filter_many(texts, allow_num, preserve_case) == expected
@@ -1,3 +1,5 @@
+import itertools
+
 import pytest
 from Aquila_Resolve import G2p
 
@@ -43,6 +45,18 @@ def test_lookup(g2p, word, phoneme):
     assert g2p.lookup(word) == phoneme
 
 
+# Test for lookup cache
+def test_lookup_cache(g2p):
+    g2p.lookup_cache.clear()
+    assert g2p.lookup("Cat", "NN") == "K AE1 T"
+    # Keys are case-insensitive, and only distinguish plural pos tags
+    assert g2p.lookup("cat", "VB") == "K AE1 T"
+    assert g2p.lookup("cat", "NNS") == "K AE1 T"
+    assert g2p.lookup_cache.hits == 1
+    assert g2p.lookup_cache.misses == 2
+    assert len(g2p.lookup_cache) == 2
+
+
 # Test for convert method
 @pytest.mark.parametrize("line, ph_line", zip(cde_lines, cde_expected_results))
 def test_convert(g2p, line, ph_line):
@@ -63,3 +77,92 @@ def test_convert(g2p, line, ph_line):
 def test_convert_ex_format(g2p, case):
     with pytest.raises(ValueError):
         g2p.convert(case)
+
+
+# Test for convert_batch method
+def test_convert_batch(g2p):
+    assert g2p.convert_batch(cde_lines) == cde_expected_results
+
+
+# Test that OOV words across lines are inferred in a single batch
+# noinspection SpellCheckingInspection
+def test_convert_batch_infer(g2p, mocker):
+    lines = ["Did you kalpe the Hevinet?", "The Hevinet was tensorflowing."]
+    expected = [g2p.convert(line) for line in lines]
+    g2p.lookup_cache.clear()
+    mock_infer = mocker.patch.object(g2p, "infer", wraps=g2p.infer)
+    assert g2p.convert_batch(lines) == expected
+    assert mock_infer.call_count == 1
+
+
+# Test that words built from queued words are not queued for inference as well
+# noinspection SpellCheckingInspection
+def test_prefetch_parts(g2p, mocker):
+    g2p.lookup_cache.clear()
+    mock_infer = mocker.patch.object(
+        g2p, "infer", side_effect=lambda words: ["K AA1"] * len(words)
+    )
+    g2p._prefetch([("kalpe-hevinet", None), ("kalpe's", None)])
+    mock_infer.assert_called_once_with(["kalpe", "hevinet"])
+    # Dry-run lookups do not count in the cache statistics
+    assert g2p.lookup_cache.info()["misses"] == 0
+    assert g2p.lookup("kalpe-hevinet") == "K AA1 K AA1"
+    assert g2p.lookup("kalpe's") == "K AA1 Z"
+    assert mock_infer.call_count == 1
+    g2p._predictions.clear()
+    g2p.lookup_cache.clear()
+
+
+# Test streaming conversion in batches
+@pytest.mark.parametrize("batch_size", [1, 3, 64])
+def test_convert_iter(g2p, mocker, batch_size):
+    spy = mocker.spy(g2p, "convert_batch")
+    results = g2p.convert_iter(iter(cde_lines), batch_size=batch_size)
+    assert list(results) == cde_expected_results
+    assert spy.call_count == -(-len(cde_lines) // batch_size)
+
+
+# Test that input is consumed lazily, one batch at a time
+def test_convert_iter_lazy(g2p):
+    lines = itertools.cycle(cde_lines)  # Unbounded input
+    results = g2p.convert_iter(lines, batch_size=2)
+    assert list(itertools.islice(results, 5)) == cde_expected_results + [
+        cde_expected_results[0]
+    ]
+    with pytest.raises(ValueError):
+        next(g2p.convert_iter(cde_lines, batch_size=0))
+
+
+# Test that lines are only tagged when they contain heteronyms or plural candidates
+# noinspection SpellCheckingInspection
+@pytest.mark.parametrize(
+    "line, tagged",
+    [
+        ("The cat sat on the mat.", False),
+        ("The cat {R IY1 D} the book.", False),
+        ("The cat read the book.", True),
+        ("The zorblaxes sat.", True),
+    ],
+)
+def test_convert_tagging(g2p, mocker, line, tagged):
+    spy = mocker.spy(g2p.h2p, "tag_many")
+    g2p.convert(line)
+    assert (spy.call_count == 1) is tagged
+
+
+# Test for convert_batch format exception
+def test_convert_batch_ex_format(g2p):
+    with pytest.raises(ValueError):
+        g2p.convert_batch(["The cat {R {IY1 D} the} book.", "The cat read."])
+
+
+# Test lazy loading of the inference model
+# noinspection SpellCheckingInspection
+def test_lazy_infer():
+    g2p = G2p(lazy_infer=True)
+    assert not g2p.infer.loaded
+    # Dictionary words do not load the model
+    assert g2p.convert("The cat.") == "{DH AH0} {K AE1 T}."
+    assert not g2p.infer.loaded
+    g2p.lookup("ioniformi")
+    assert g2p.infer.loaded
@@ -39,8 +39,36 @@ def test_replace_het(h2p, line, expected):
     assert h2p.replace_het(line) == expected
 
 
+# Test that lines without heteronyms are not tagged
+def test_replace_het_untagged(h2p, mocker):
+    spy = mocker.spy(h2p, "get_tags")
+    assert h2p.replace_het("The cat sat on the mat.") == "The cat sat on the mat."
+    assert h2p.replace_het_list(["The cat sat.", ex_lines[0]]) == [
+        "The cat sat.",
+        ex_expected_results[0],
+    ]
+    assert spy.call_count == 1
+
+
 # Test the replace_het_list function
 def test_replace_het_list(h2p):
     results = h2p.replace_het_list(ex_lines)
     for result, expected in zip(results, ex_expected_results):
         assert expected == result
+
+
+# Test that one tagger instance is kept, and tag_many matches get_tags
+def test_tag_many(h2p):
+    sentences = [line.split() for line in ex_lines]
+    assert h2p.tagger is h2p.tagger
+    assert h2p.tag_many(sentences) == [h2p.get_tags(words) for words in sentences]
+    with pytest.raises(TypeError):
+        h2p.get_tags("read")
+
+
+# Test that results of tag are cached
+def test_tag_cache(h2p, mocker):
+    spy = mocker.spy(h2p, "get_tags")
+    assert h2p.tag("books") == ["NNS"]
+    assert h2p.tag("books") == ["NNS"]
+    assert spy.call_count == 1
@@ -1,4 +1,9 @@
+import os
+import subprocess
+import sys
+
 import pytest
+import torch
 from Aquila_Resolve.infer import Infer
 
 
@@ -20,3 +25,108 @@ def infer():
 )
 def test_infer(infer, case, exp):
     assert infer(case) == exp
+
+
+# noinspection SpellCheckingInspection
+def test_infer_cache(tmp_path, mocker):
+    infer = Infer(cache_path=tmp_path / "cache.db")
+    assert infer(["ioniformi", "a"]) == ["IY0 AA2 N IH0 F AO1 R M IY0", "AH0"]
+    # Predictions are loaded from the persistent cache
+    cached = Infer(cache_path=tmp_path / "cache.db")
+    mock_predict = mocker.patch.object(cached, "_predict", return_value=["B IY1"])
+    assert cached(["a", "b", "ioniformi"]) == [
+        "AH0",
+        "B IY1",
+        "IY0 AA2 N IH0 F AO1 R M IY0",
+    ]
+    mock_predict.assert_called_once_with(["b"])
+
+
+def test_infer_lazy(tmp_path, mocker):
+    from Aquila_Resolve import infer as infer_module
+
+    mock_download = mocker.spy(infer_module, "ensure_download")
+    infer = Infer(lazy=True, cache_path=tmp_path / "cache.db")
+    # Nothing is downloaded or opened until the first prediction
+    mock_download.assert_not_called()
+    assert infer.cache is None
+    assert not infer.loaded
+    assert infer(["a"]) == ["AH0"]
+    assert infer.loaded
+    assert infer.cache is not None
+    mock_download.assert_called()
+
+
+def test_infer_scripted(tmp_path, monkeypatch):
+    from Aquila_Resolve import infer as infer_module
+    from Aquila_Resolve.export import export_scripted
+
+    # Exported to the location read by Infer, in a cache directory of this test
+    monkeypatch.setenv("AQUILA_RESOLVE_CACHE", str(tmp_path))
+    ts_file = export_scripted()
+    assert os.path.dirname(ts_file) == str(tmp_path)
+    scripted = Infer()
+    assert isinstance(scripted.model.predictor.model, torch.jit.ScriptModule)
+    words = ["a", "ioniformi", "tensorflow"]
+    assert scripted(words) == Infer(scripted=False)(words)
+    # Export of another checkpoint is ignored
+    monkeypatch.setattr(infer_module, "get_checksum", lambda _: "other")
+    with pytest.warns(UserWarning):
+        stale = Infer()
+    assert not isinstance(stale.model.predictor.model, torch.jit.ScriptModule)
+    monkeypatch.undo()
+    # Export of another version of the decoding code is ignored
+    from Aquila_Resolve.models.dp.model import model as model_module
+
+    monkeypatch.setenv("AQUILA_RESOLVE_CACHE", str(tmp_path))
+    monkeypatch.setattr(
+        model_module, "_SCRIPTED_VERSION", model_module._SCRIPTED_VERSION + 1
+    )
+    with pytest.warns(UserWarning, match="outdated"):
+        outdated = Infer()
+    assert not isinstance(outdated.model.predictor.model, torch.jit.ScriptModule)
+
+
+_NUMPY_SCRIPT = """
+import sys
+from Aquila_Resolve.infer import Infer
+print(Infer(backend="numpy")(["ioniformi"])[0])
+print("torch" in sys.modules)
+"""
+
+
+def test_infer_numpy():
+    words = ["a", "ioniformi", "tensorflow"]
+    assert Infer(backend="numpy")(words) == Infer(scripted=False)(words)
+    # Once the weights are converted, a new process runs without importing torch
+    out = subprocess.run(
+        [sys.executable, "-c", _NUMPY_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout.split() == [
+        "IY0",
+        "AA2",
+        "N",
+        "IH0",
+        "F",
+        "AO1",
+        "R",
+        "M",
+        "IY0",
+        "False",
+    ]
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"backend": "onnx"},
+        {"backend": "numpy", "precision": "int8"},
+        {"backend": "numpy", "device": "cuda"},
+    ],
+)
+def test_infer_backend_ex(kwargs):
+    with pytest.raises(ValueError):
+        Infer(**kwargs)
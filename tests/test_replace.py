@@ -1,5 +1,5 @@
 import pytest
-from Aquila_Resolve.text.replace import replace_first
+from Aquila_Resolve.text.replace import replace_first, replace_words
 
 
 # Test for the test_replace_first function
@@ -17,3 +17,54 @@ from Aquila_Resolve.text.replace import replace_first
 )
 def test_replace_first(search, replace, line, expected):
     assert replace_first(search, replace, line) == expected
+
+
+# Test that replace_first matches targets literally
+@pytest.mark.parametrize(
+    "target, replacement, text, expected",
+    [
+        ("read", "{R EH1 D}", "I read it.", "I {R EH1 D} it."),
+        (
+            "read",
+            "{R EH1 D}",
+            "Read the {R IY1 D} read.",
+            "{R EH1 D} the {R IY1 D} read.",
+        ),
+        ("a.m", "{X}", "at 9 a.m. or 9 am", "at 9 {X}. or 9 am"),
+        ("a.m", "{X}", "at 9 abm", "at 9 abm"),
+        ("cat", r"{K \1 T}", "the cat", r"the {K \1 T}"),
+        ("", "{X}", "the cat", "the cat"),
+        ("cat", "{X}", "{K, AE1 T} cat", "{K, AE1 T} {X}"),
+    ],
+)
+def test_replace_first_escape(target, replacement, text, expected):
+    assert replace_first(target, replacement, text) == expected
+
+
+# Test that replace_words matches replace_first applied to each word in order
+@pytest.mark.parametrize(
+    "text, words",
+    [
+        ("The cat read the book.", ["The", "cat", "read", "the", "book"]),
+        ("I {R EH1 D} the book, then read.", ["I", "the", "book", "then", "read"]),
+        ("Don't do it, don.", ["Don't", "do", "it", "don"]),
+        ("rock&roll rock roll", ["rockroll", "rock", "roll"]),
+        ("3a a", ["a", "a"]),
+        ("café cafe", ["cafe", "cafe"]),
+        ("x-ray x ray", ["x-ray", "x", "ray"]),
+        ("A.M. at 9 a.m", ["A.M", "at", "a.m"]),
+        ("", ["a"]),
+    ],
+)
+def test_replace_words(text, words):
+    pairs = [(word, "{" + word.upper() + "}") for word in words]
+    expected = text
+    for target, replacement in pairs:
+        expected = replace_first(target, replacement, expected)
+    assert replace_words(pairs, text) == expected
+
+
+# Unlike replace_first, words starting or ending with punctuation are matched
+def test_replace_words_punctuation():
+    pairs = [("'em", "{AH0 M}"), ("a.m.", "{EY1 EH1 M}")]
+    assert replace_words(pairs, "get 'em by 9 a.m.") == "get {AH0 M} by 9 {EY1 EH1 M}"
@@ -1,6 +1,13 @@
+import gzip
+import json
+import os
+import shutil
+import time
+
 import pytest
 
-from Aquila_Resolve import static_dict
+from Aquila_Resolve import static_dict, symbols
+from Aquila_Resolve.data import DATA_PATH, get_cache_dir
 
 
 @pytest.fixture(scope="module")
@@ -29,3 +36,118 @@ def test_get_cmudict_content(word, result, cd):
 def test_get_cmudict_ex():
     with pytest.raises(FileNotFoundError):
         static_dict.get_cmudict(filename="not_exist.json.gz")
+
+
+@pytest.fixture(scope="module")
+def cd_mapped(tmp_path_factory):
+    # Compiled from a copy, so the binary file is not written to the package data
+    path = tmp_path_factory.mktemp("cmudict") / "cmudict.json.gz"
+    shutil.copy(str(DATA_PATH.joinpath("cmudict.json.gz")), path)
+    result = static_dict.get_cmudict(filename=path, mmap=True)
+    yield result
+    result.close()
+
+
+def test_get_cmudict_mmap(cd_mapped, cd):
+    assert isinstance(cd_mapped, static_dict.MappedDict)
+    assert len(cd_mapped) == len(cd)
+    assert set(cd_mapped) == set(cd)
+    for word, phonemes in cd.items():
+        assert cd_mapped[word] == phonemes
+
+
+@pytest.mark.parametrize("word", ["", "not_a_word", "zzzzzzzz", "'", 3, None])
+def test_get_cmudict_mmap_missing(word, cd_mapped):
+    assert word not in cd_mapped
+    assert cd_mapped.get(word) is None
+    with pytest.raises(KeyError):
+        _ = cd_mapped[word]
+
+
+def test_get_cmudict_mmap_rebuild(tmp_path):
+    src = tmp_path / "custom.json.gz"
+    with gzip.open(src, "wt") as f:
+        json.dump({"park": "P AA1 R K"}, f)
+    cd = static_dict.get_cmudict(filename=src, mmap=True)
+    bin_file = static_dict.compiled_path(src)
+    assert os.path.dirname(bin_file) == str(get_cache_dir())
+    assert os.path.exists(bin_file)
+    assert dict(cd) == {"park": "P AA1 R K"}
+    cd.close()
+    # Updated source is compiled again
+    with gzip.open(src, "wt") as f:
+        json.dump({"park": "P AA1 R K", "aalto": "AA1 L T OW2 "}, f)
+    os.utime(src, ns=(time.time_ns() + 10**9,) * 2)
+    cd = static_dict.get_cmudict(filename=src, mmap=True)
+    assert dict(cd) == {"park": "P AA1 R K", "aalto": "AA1 L T OW2 "}
+    cd.close()
+
+
+def test_get_cmudict_mmap_version(tmp_path):
+    src = tmp_path / "custom.json.gz"
+    with gzip.open(src, "wt") as f:
+        json.dump({"park": "P AA1 R K"}, f)
+    # Files of an older format version are compiled again
+    bin_file = static_dict.compiled_path(src)
+    with open(bin_file, "wb") as f:
+        f.write(static_dict._HEADER.pack(b"AQCD", 1, static_dict._BOM, 0, 0, 0, 0, 1))
+    os.utime(src, ns=(time.time_ns() - 10**9,) * 2)
+    cd = static_dict.get_cmudict(filename=src, mmap=True)
+    assert dict(cd) == {"park": "P AA1 R K"}
+    cd.close()
+
+
+def test_get_cmudict_readonly(tmp_path, monkeypatch):
+    src = tmp_path / "custom.json.gz"
+    with gzip.open(src, "wt") as f:
+        json.dump({"park": "P AA1 R K"}, f)
+    # Cache directory that can not be created, as its parent is a file
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("AQUILA_RESOLVE_CACHE", str(tmp_path / "file" / "cache"))
+    for kwargs in ({"mmap": True}, {"compact": True}):
+        with pytest.warns(UserWarning, match="using the json dictionary"):
+            cd = static_dict.get_cmudict(filename=src, **kwargs)
+        assert cd == {"park": "P AA1 R K"}
+    with pytest.raises(FileNotFoundError):
+        static_dict.get_cmudict(filename=tmp_path / "not_exist.json.gz", mmap=True)
+
+
+def test_mapped_dict_ex(tmp_path):
+    path = tmp_path / "bad.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        static_dict.MappedDict(path)
+
+
+@pytest.fixture(scope="module")
+def cd_compact(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cmudict") / "cmudict.json.gz"
+    shutil.copy(str(DATA_PATH.joinpath("cmudict.json.gz")), path)
+    yield static_dict.get_cmudict(filename=path, compact=True)
+
+
+def test_get_cmudict_compact(cd_compact, cd):
+    assert isinstance(cd_compact, static_dict.CompactDict)
+    assert len(cd_compact) == len(cd)
+    assert set(cd_compact) == set(cd)
+    for word, phonemes in cd.items():
+        assert cd_compact[word] == phonemes
+
+
+@pytest.mark.parametrize("word", ["", "not_a_word", "zzzzzzzz", "'", 3, None])
+def test_get_cmudict_compact_missing(word, cd_compact):
+    assert word not in cd_compact
+    assert cd_compact.get(word) is None
+    with pytest.raises(KeyError):
+        _ = cd_compact[word]
+
+
+def test_compact_dict_symbols(tmp_path):
+    src = tmp_path / "custom.json.gz"
+    entries = {"park": "P AA1 R K", "aalto": "AA1 L T OW2 ", "empty": ""}
+    with gzip.open(src, "wt") as f:
+        json.dump(entries, f)
+    cd = static_dict.get_cmudict(filename=src, compact=True)
+    assert dict(cd) == entries
+    # Phonemes are stored as indices into symbols.phonemes
+    assert cd._symbols[: len(symbols.phonemes)] == symbols.phonemes
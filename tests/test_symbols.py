@@ -64,3 +64,42 @@ def test_contains_alpha(case, exp):
 )
 def test_is_phoneme(case, exp):
     assert symbols.is_braced(case) == exp
+
+
+@pytest.mark.parametrize(
+    "case, exp",
+    [
+        ("In line.", True),
+        ("In {AH0} line.", True),
+        ("{AH0} {L AY1 N}", True),
+        ("In {AH0 line.", False),
+        ("In AH0} line.", False),
+        ("In {AH0 {L AY1 N}}", False),
+    ],
+)
+def test_valid_braces(case, exp):
+    assert symbols.valid_braces(case) is exp
+    if not exp:
+        with pytest.raises(ValueError):
+            symbols.valid_braces(case, raise_on_invalid=True)
+
+
+@pytest.mark.parametrize(
+    "case, regions",
+    [
+        ("In line.", []),
+        ("In {AH0} line.", [(3, 8)]),
+        ("{AH0} {L AY1 N}", [(0, 5), (6, 15)]),
+        ("In {AH0 line.", []),
+        ("In {AH0 {L AY1 N}.", [(3, 17)]),
+        ("In AH0} {line}.", [(8, 14)]),
+    ],
+)
+def test_brace_index(case, regions):
+    braces = symbols.BraceIndex(case)
+    assert list(zip(braces.starts, braces.ends)) == regions
+    assert len(braces) == len(regions)
+    for pos in range(len(case)):
+        inside = [(start, end) for start, end in regions if start <= pos < end]
+        assert braces.region(pos) == (inside[0] if inside else None)
+        assert (pos in braces) is bool(inside)
@@ -152,3 +152,49 @@ def test__expand_number(text, expected):
 def test__normalize_numbers(text, expected):
     result = numbers.normalize_numbers(text)
     assert result == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("No numbers here.", []),
+        ("Paid $5 million for 12 items.", [(5, 15), (20, 29)]),
+        ("In 1 2 3 line", [(3, 13)]),
+        ("Chapter XIV.", [(8, 12)]),
+        ("1", [(0, 1)]),
+    ],
+)
+def test__numeric_spans(text, expected):
+    assert list(numbers._numeric_spans(text)) == expected
+
+
+# Numbers within phoneme braces are not expanded
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("In {HH AH0 L OW1} 12 km.", "In {HH AH0 L OW1} twelve kilometers."),
+        ("In {AH0 12 K M} line.", "In {AH0 12 K M} line."),
+        (
+            "In 1.5 km and 2 {M IY1 T ER0 Z} line.",
+            "In one point five kilometers and two {M IY1 T ER0 Z} line.",
+        ),
+        (
+            "Chapter XIV, 3x4 in the 1990s.",
+            "Chapter fourteen, three by four in the nineteen nineties.",
+        ),
+        ("Paid $5 million\non the 3rd.", "Paid five million dollars\non the third."),
+        # Unmatched braces are literal
+        ("In { 12 km and 5 cats.", "In { twelve kilometers and five cats."),
+        ("In {AH0} { 12 km.", "In {AH0} { twelve kilometers."),
+    ],
+)
+def test__normalize_numbers_spans(text, expected):
+    assert numbers.normalize_numbers(text) == expected
+
+
+# Numbers too long for inflect are read digit by digit
+def test__normalize_numbers_long():
+    text = "Id " + "1234567890" * 4 + "."
+    expected = "Id " + " ".join(numbers._digit_words[int(c)] for c in "1234567890" * 4)
+    assert numbers.normalize_numbers(text) == expected + "."
+    assert numbers.normalize_numbers("9" * 36).startswith("nine hundred and ninety")